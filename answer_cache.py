@@ -0,0 +1,55 @@
+import time
+import threading
+from collections import OrderedDict
+from utils import ANSWER_CACHE_TTL
+
+class AnswerCache:
+    """LRU cache of final answers, invalidated by TTL or when the index changes"""
+
+    def __init__(self, ttl=ANSWER_CACHE_TTL, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "seconds_saved": 0.0}
+
+    def _fresh(self, entry, index_version, max_age):
+        return entry["index_version"] == index_version and time.time() - entry["stored_at"] < max_age
+
+    def get(self, key, index_version):
+        """Return a fresh entry or None, counting the compute time a hit avoided"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._fresh(entry, index_version, self.ttl):
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["seconds_saved"] += entry["compute_seconds"]
+            return entry
+
+    def put(self, key, response, metadata, index_version, compute_seconds):
+        with self._lock:
+            self._entries[key] = {
+                "response": response,
+                "metadata": metadata,
+                "index_version": index_version,
+                "stored_at": time.time(),
+                "compute_seconds": compute_seconds,
+            }
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def needs_refresh(self, key, index_version, refresh_ratio=0.8):
+        """True when an entry is missing, stale, or close enough to expiry to recompute early"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is None or not self._fresh(entry, index_version, self.ttl * refresh_ratio)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        stats["seconds_saved"] = round(stats["seconds_saved"], 2)
+        return stats
@@ -1,9 +1,14 @@
 import streamlit as st
 import time
+import uuid
+from collections import deque
 from document_processor import process_documents
-from embedding_manager import initialize_embeddings, create_vector_store, load_vector_store
-from chat_manager import initialize_groq_llm, automatic_search
-from utils import validate_environment, get_mode_display_info
+from embedding_manager import initialize_embeddings, create_vector_store, load_vector_store, shard_vector_store
+from chat_manager import initialize_groq_llm, automatic_search, get_answer_cache_stats, get_coalescing_stats
+from prefetch import start_prefetch, get_prefetch_stats
+from profiler import is_profiling_enabled, set_profiling
+from conversation_store import get_conversation_store
+from utils import validate_environment, get_mode_display_info, cpu_timer, HISTORY_WINDOW, QUICK_QUESTIONS
 
 # Page configuration (must be before other Streamlit UI calls)
 st.set_page_config(
@@ -14,8 +19,7 @@ st.set_page_config(
 )
 
 # --- CSS (kept your theme) ---
-st.markdown(
-    """
+APP_CSS = """
 <style>
 /* ==========================
    Global body & fonts
@@ -175,9 +179,7 @@ input[type="text"], textarea {
 }
 
 </style>
-""",
-    unsafe_allow_html=True,
-)
+"""
 
 # ----------------------
 # Session-state helpers
@@ -187,7 +189,6 @@ def initialize_session_state():
     defaults = {
         "vector_store": None,
         "llm": None,
-        "chat_history": [],
         "documents_loaded": False,
         "embeddings": None,
         "current_search_mode": None,
@@ -195,11 +196,21 @@ def initialize_session_state():
         "folder_stats": {},
         # helper for pending quick questions
         "pending_question": None,
+        # id of the oldest turn shown when paging back through persisted history
+        "history_cursor": None,
     }
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
 
+    # Conversation lives in the SQLite store; session_state only keeps a bounded window.
+    # The session id rides in the URL so a reload or server restart resumes the same chat.
+    if "session_id" not in st.session_state:
+        session_id = st.query_params.get("sid") or uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+        st.session_state.session_id = session_id
+        st.session_state.chat_history = get_conversation_store().load_window(session_id)
+
 # ----------------------
 # System initialization
 # ----------------------
@@ -216,20 +227,28 @@ def initialize_system():
 
             if not st.session_state.vector_store:
                 # Process documents from folder
-                documents, folder_stats = process_documents()
+                documents, folder_stats, dedup_stats = process_documents()
                 st.session_state.folder_stats = folder_stats or {}
                 # Create vector store (documents may be list of dicts)
-                st.session_state.vector_store = create_vector_store(documents, st.session_state.embeddings)
+                st.session_state.vector_store = create_vector_store(documents, st.session_state.embeddings, dedup_stats)
                 st.session_state.documents_loaded = True
             else:
                 st.session_state.documents_loaded = True
                 st.session_state.folder_stats = {"Cached": "Previously loaded"}
 
+            # Sharded mode (NUM_SHARDS > 0): scatter-gather search over worker processes
+            st.session_state.vector_store = shard_vector_store(
+                st.session_state.vector_store, st.session_state.embeddings
+            )
+
             # Initialize LLM (Groq)
             if st.session_state.llm is None:
                 st.session_state.llm = initialize_groq_llm()
 
             st.session_state.system_initialized = True
+
+            # Warm the answer cache for the Quick Question buttons in the background
+            start_prefetch(st.session_state.llm, st.session_state.vector_store)
             return True, "System initialized successfully!"
         except Exception as e:
             # Return error message to UI
@@ -267,6 +286,10 @@ def display_search_analytics(metadata):
         with c4:
             st.metric("Web Sources", str(web_results_count))
 
+        tokens_saved = safe_get(metadata, "input_tokens_saved")
+        if tokens_saved is not None:
+            st.caption(f"✂️ Context compression saved {tokens_saved} input tokens")
+
         st.markdown("#### Confidence Scores")
         if isinstance(confidence_scores, dict) and confidence_scores:
             for m, score in confidence_scores.items():
@@ -279,46 +302,53 @@ def display_search_analytics(metadata):
         else:
             st.write("Confidence breakdown not available.")
 
+def display_history(turns):
+    """Render conversation turns, newest first"""
+    for chat in turns:
+        q = chat.get("question") or chat.get("query") or ""
+        a = chat.get("answer") or chat.get("response") or ""
+        metadata = chat.get("metadata") or chat.get("meta") or {}
+        st.markdown(f'<div class="user-message">{q}</div>', unsafe_allow_html=True)
+        if metadata:
+            mode_info = get_mode_display_info(safe_get(metadata, "mode", "unknown"))
+            st.caption(f"{mode_info.get('icon','')} {mode_info.get('name','Unknown')} • {safe_get(metadata,'confidence',0)}% confidence")
+        st.markdown(f'<div class="assistant-message">{a}</div>', unsafe_allow_html=True)
+        st.markdown("---")
+
+def display_older_history():
+    """Page older turns from the conversation store without keeping them in session_state"""
+    window = st.session_state.chat_history
+    oldest_in_window = safe_get(window[0], "id") if window else None
+    if oldest_in_window is None:
+        return
+
+    store = get_conversation_store()
+    session_id = st.session_state.session_id
+    cursor = st.session_state.history_cursor or oldest_in_window
+    if cursor != oldest_in_window:
+        display_history(reversed(store.between(session_id, cursor, oldest_in_window)))
+
+    page = store.older(session_id, cursor, HISTORY_WINDOW)
+    if page and st.button("⬇️ Load older messages", use_container_width=True):
+        st.session_state.history_cursor = page[0]["id"]
+        # Only the chat fragment needs to redraw for another page
+        st.rerun(scope="fragment")
+
+@st.fragment
 def display_quick_questions():
     """Display quick questions in an organized way"""
-    st.markdown("### 💡 Quick Questions")
-
-    categories = {
-        "🤖 Artificial Intelligence": [
-            "Explain the difference between AI and machine learning",
-            "What are the latest trends in natural language processing?",
-            "How do neural networks learn from data?",
-            "What are the ethical considerations in AI development?"
-        ],
-        "💼 Business Strategy": [
-            "What are the key elements of a successful business model?",
-            "How to conduct competitive market analysis?",
-            "Explain different digital transformation strategies",
-            "What are current challenges in global business?"
-        ],
-        "🔬 Research Methodology": [
-            "What are the best practices for academic research?",
-            "How to design effective research experiments?",
-            "Explain qualitative vs quantitative research methods",
-            "What makes research findings statistically significant?"
-        ],
-        "🚀 Technology Trends": [
-            "What are the emerging technologies in 2024?",
-            "How is cloud computing evolving?",
-            "Explain the impact of IoT on daily life",
-            "What are the security challenges in modern tech?"
-        ]
-    }
-
-    for category, questions in categories.items():
-        st.markdown(f'<div class="category-header">{category}</div>', unsafe_allow_html=True)
-        for question in questions:
-            # Use stable key by using absolute hash
-            key = f"q_{abs(hash(question))}"
-            if st.button(question, key=key, use_container_width=True):
-                st.session_state.pending_question = question
-                # We rerun so the question flows into the chat_input processing
-                st.rerun()
+    with cpu_timer("quick questions fragment"):
+        st.markdown("### 💡 Quick Questions")
+
+        for category, questions in QUICK_QUESTIONS.items():
+            st.markdown(f'<div class="category-header">{category}</div>', unsafe_allow_html=True)
+            for question in questions:
+                # Use stable key by using absolute hash
+                key = f"q_{abs(hash(question))}"
+                if st.button(question, key=key, use_container_width=True):
+                    st.session_state.pending_question = question
+                    # Full-app rerun so the question flows into the chat fragment
+                    st.rerun()
 
 def display_welcome_screen():
     """Display welcome screen"""
@@ -372,34 +402,25 @@ def display_welcome_screen():
         """, unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
-# ----------------------
-# Main
-# ----------------------
-def main():
-    # header
-    h1_col_left, h1_col_mid, h1_col_right = st.columns([1, 2, 1])
-    with h1_col_mid:
-        st.markdown(
-            '<h1 class="gradient-text" style="text-align: center; font-size: 3rem; margin-bottom: 0.5rem;">NeuroSearch AI</h1>',
-            unsafe_allow_html=True
-        )
-        st.markdown('<p style="text-align: center; color: #888; margin-bottom: 2rem;">Intelligent Research Assistant • Document Analysis • Real-time Insights</p>', unsafe_allow_html=True)
-
-    # session-state init
-    initialize_session_state()
-
-    # Sidebar: validation, system controls, status
-    with st.sidebar:
-        st.markdown("## 🎛️ Control Panel")
-
-        # API & env validation
-        errors = validate_environment()
-        if errors:
-            for err in errors:
-                st.error(f"🔴 {err}")
-            # stop further UI; user must fix environment
-            return
+@st.cache_data(show_spinner=False, ttl=300)
+def get_chunk_count(store_id, _vector_store):
+    """Chunk count of the current store, cached so reruns don't hit the index"""
+    # different vector stores expose different APIs; try common ones
+    # chroma-like
+    try:
+        return _vector_store._collection.count()
+    except Exception:
+        pass
+    # simple len
+    try:
+        return len(_vector_store)
+    except Exception:
+        return "N/A"
 
+@st.fragment
+def display_control_panel():
+    """Sidebar status cards, chunk count and controls; reruns independently of the chat"""
+    with cpu_timer("sidebar fragment"):
         # System status cards
         st.markdown("### 📈 System Status")
         s_col1, s_col2 = st.columns(2)
@@ -434,34 +455,37 @@ def main():
 
             # Document stats (robust)
             if st.session_state.documents_loaded and st.session_state.vector_store:
-                try:
-                    # different vector stores expose different APIs; try common ones
-                    vs = st.session_state.vector_store
-                    doc_count = None
-                    # chroma-like
-                    try:
-                        doc_count = vs._collection.count()
-                    except Exception:
-                        pass
-                    # simple len
-                    if doc_count is None:
-                        try:
-                            doc_count = len(vs)
-                        except Exception:
-                            pass
-                    # fallback
-                    doc_count = doc_count if doc_count is not None else "N/A"
-
-                    st.markdown(f"""
-                    <div class="neuro-card">
-                        <div style="text-align: center;">
-                            <div class="stat-number">{doc_count}</div>
-                            <div>Knowledge Chunks</div>
-                        </div>
+                vs = st.session_state.vector_store
+                doc_count = get_chunk_count(id(vs), vs)
+                st.markdown(f"""
+                <div class="neuro-card">
+                    <div style="text-align: center;">
+                        <div class="stat-number">{doc_count}</div>
+                        <div>Knowledge Chunks</div>
                     </div>
-                    """, unsafe_allow_html=True)
-                except Exception:
-                    pass
+                </div>
+                """, unsafe_allow_html=True)
+
+                # Sharded mode: per-shard liveness and latency
+                if hasattr(vs, "health"):
+                    with st.expander("🧩 Shard Health", expanded=False):
+                        for shard in vs.health():
+                            status = "🟢" if shard["alive"] else ("🟡" if shard["recovering"] else "🔴")
+                            st.caption(f"{status} Shard {shard['shard']}: {shard['chunks']} chunks • p50 {shard['p50_ms']} ms • p99 {shard['p99_ms']} ms")
+
+            cache_stats = get_answer_cache_stats()
+            st.caption(f"⚡ Answer cache: {cache_stats['hits']} hits • {cache_stats['seconds_saved']}s saved")
+            coalescing = get_coalescing_stats()
+            st.caption(f"🔗 Coalesced: {coalescing['coalesced_calls']} requests • "
+                       f"{coalescing['groq_calls_saved']} Groq / {coalescing['serper_calls_saved']} Serper calls saved")
+            prefetch = get_prefetch_stats()
+            st.caption(f"🔮 Prefetch: {prefetch['refreshed']} refreshed • {prefetch['failed']} failed • "
+                       f"{prefetch['deferred_for_users']} deferred for users")
+
+            profiling = st.toggle("🔬 Profile queries", value=is_profiling_enabled(),
+                                  help="Write flamegraph-compatible samples to ./profiles")
+            if profiling != is_profiling_enabled():
+                set_profiling(profiling)
 
             # Refresh & Clear Chat
             c1, c2 = st.columns(2)
@@ -472,21 +496,19 @@ def main():
                     st.session_state.embeddings = None
                     st.session_state.llm = None
                     st.session_state.system_initialized = False
+                    get_chunk_count.clear()
                     st.rerun()
             with c2:
                 if st.button("🗑️ Clear Chat", use_container_width=True):
-                    st.session_state.chat_history = []
+                    get_conversation_store().clear(st.session_state.session_id)
+                    st.session_state.chat_history = deque(maxlen=HISTORY_WINDOW)
+                    st.session_state.history_cursor = None
                     st.rerun()
 
-    # If not initialized, show welcome and stop here
-    if not st.session_state.system_initialized:
-        display_welcome_screen()
-        return
-
-    # Main area: chat and quick questions
-    main_col, side_col = st.columns([2, 1])
-
-    with main_col:
+@st.fragment
+def display_chat():
+    """Chat input, answer and history; sending a message only reruns this fragment"""
+    with cpu_timer("chat fragment"):
         st.markdown("### 💬 Research Chat")
 
         # If a quick question was set, use it; otherwise allow user input
@@ -511,6 +533,7 @@ def main():
                             st.session_state.vector_store,
                             query,
                             st.session_state.chat_history,
+                            session_id=st.session_state.session_id,
                         )
                         # allow both tuple and dict style returns
                         if isinstance(response_tuple, tuple) and len(response_tuple) >= 3:
@@ -547,22 +570,59 @@ def main():
                     except Exception as e:
                         st.error(f"🔴 Error while searching: {str(e)}")
 
-        # Chat history (show last 5)
+        # Chat history (in-memory window, older turns paged from the store on demand)
         if st.session_state.chat_history:
             st.markdown("### 📜 Conversation History")
-            for chat in reversed(st.session_state.chat_history[-5:]):
-                q = chat.get("question") or chat.get("query") or ""
-                a = chat.get("answer") or chat.get("response") or ""
-                metadata = chat.get("metadata") or chat.get("meta") or {}
-                st.markdown(f'<div class="user-message">{q}</div>', unsafe_allow_html=True)
-                if metadata:
-                    mode_info = get_mode_display_info(safe_get(metadata, "mode", "unknown"))
-                    st.caption(f"{mode_info.get('icon','')} {mode_info.get('name','Unknown')} • {safe_get(metadata,'confidence',0)}% confidence")
-                st.markdown(f'<div class="assistant-message">{a}</div>', unsafe_allow_html=True)
-                st.markdown("---")
+            display_history(reversed(st.session_state.chat_history))
+            display_older_history()
+
+# ----------------------
+# Main
+# ----------------------
+def main():
+    # CSS and header are static; with the fragments below they only render on full-app reruns
+    st.markdown(APP_CSS, unsafe_allow_html=True)
+
+    # header
+    h1_col_left, h1_col_mid, h1_col_right = st.columns([1, 2, 1])
+    with h1_col_mid:
+        st.markdown(
+            '<h1 class="gradient-text" style="text-align: center; font-size: 3rem; margin-bottom: 0.5rem;">NeuroSearch AI</h1>',
+            unsafe_allow_html=True
+        )
+        st.markdown('<p style="text-align: center; color: #888; margin-bottom: 2rem;">Intelligent Research Assistant • Document Analysis • Real-time Insights</p>', unsafe_allow_html=True)
+
+    # session-state init
+    initialize_session_state()
+
+    # Sidebar: validation, system controls, status
+    with st.sidebar:
+        st.markdown("## 🎛️ Control Panel")
+
+        # API & env validation
+        errors = validate_environment()
+        if errors:
+            for err in errors:
+                st.error(f"🔴 {err}")
+            # stop further UI; user must fix environment
+            return
+
+        display_control_panel()
+
+    # If not initialized, show welcome and stop here
+    if not st.session_state.system_initialized:
+        display_welcome_screen()
+        return
+
+    # Main area: chat and quick questions
+    main_col, side_col = st.columns([2, 1])
+
+    with main_col:
+        display_chat()
 
     with side_col:
         display_quick_questions()
 
 if __name__ == "__main__":
-    main()
+    with cpu_timer("full app rerun"):
+        main()
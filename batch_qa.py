@@ -0,0 +1,144 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import validate_environment, logger
+
+def load_questions(path):
+    """Read {"id", "question"} records from JSONL; ids default to the line number
+
+    Lines that aren't JSON or have no non-empty "question" are logged and skipped.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"⚠️ Skipping line {line_no}: invalid JSON ({str(e)})")
+                continue
+            if isinstance(record, str):
+                record = {"question": record}
+            if not isinstance(record, dict) or not isinstance(record.get("question"), str) or not record["question"].strip():
+                logger.warning(f"⚠️ Skipping line {line_no}: no \"question\" text")
+                continue
+            record.setdefault("id", str(line_no))
+            record["id"] = str(record["id"])
+            questions.append(record)
+    return questions
+
+def load_checkpoint(path):
+    """Ids already answered successfully in a previous (possibly interrupted) run"""
+    done = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a partially written last line from an interrupted run
+                if not record.get("error"):
+                    done.add(str(record["id"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+def build_backends(fake_llm=False, fake_web=False, use_index=True, fake_limits=None):
+    """Create the LLM, its admission scheduler and the vector store once; every worker thread shares them"""
+    import search_manager
+    from chat_manager import initialize_groq_llm
+    from fake_backends import FakeLLM, RateLimitedFakeLLM, fake_google_search
+    from llm_scheduler import LLMScheduler, UnlimitedScheduler, get_scheduler
+
+    if fake_web:
+        search_manager.set_search_backend(fake_google_search)
+    if fake_llm and fake_limits:
+        # Pace the run to the fake's own quota rather than Groq's
+        llm, scheduler = RateLimitedFakeLLM(*fake_limits), LLMScheduler(*fake_limits)
+    elif fake_llm:
+        llm, scheduler = FakeLLM(), UnlimitedScheduler()
+    else:
+        llm, scheduler = initialize_groq_llm(), get_scheduler()
+
+    vector_store = None
+    if use_index:
+        from embedding_manager import initialize_embeddings, load_vector_store
+        vector_store = load_vector_store(initialize_embeddings())
+        if vector_store is None:
+            logger.warning("⚠️ No vector store found; answering without documents")
+    return llm, vector_store, scheduler
+
+def answer_question(llm, vector_store, record, scheduler=None):
+    from chat_manager import automatic_search
+
+    start = time.perf_counter()
+    result = {"id": record["id"], "question": record["question"]}
+    try:
+        response, _, search_metadata = automatic_search(
+            llm, vector_store, record["question"], priority="batch", scheduler=scheduler
+        )
+        result["search_metadata"] = search_metadata
+        result["timings"] = dict(search_metadata.get("timings", {}))
+        if response.startswith("Error:"):
+            # generate_response reports LLM failures as text; record them so a resumed run retries
+            result["error"] = response[len("Error:"):].strip()
+        else:
+            result["answer"] = response
+    except Exception as e:
+        result["error"] = str(e)
+        result["timings"] = {}
+    result["timings"]["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+def run_batch(questions, output_path, llm, vector_store, concurrency=4, scheduler=None):
+    """Answer questions with bounded concurrency, appending each result as it completes"""
+    done = load_checkpoint(output_path)
+    pending = [q for q in questions if q["id"] not in done]
+    logger.info(f"📋 {len(questions)} questions, {len(done)} already answered, {len(pending)} to run")
+
+    write_lock = threading.Lock()
+    stats = {"answered": 0, "errors": 0}
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(answer_question, llm, vector_store, q, scheduler) for q in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            with write_lock:
+                # One flushed line per answer is the checkpoint a resumed run reads back
+                out.write(json.dumps(result, default=str) + "\n")
+                out.flush()
+            stats["errors" if result.get("error") else "answered"] += 1
+            status = f"❌ {result['error']}" if result.get("error") else "✅"
+            logger.info(f"{status} [{stats['answered'] + stats['errors']}/{len(pending)}] {result['id']} ({result['timings']['total_ms']} ms)")
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay saved questions through automatic_search")
+    parser.add_argument("questions", help="JSONL file of {\"id\", \"question\"} records")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL results file (also the resume checkpoint)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Questions answered in parallel")
+    parser.add_argument("--fake-llm", action="store_true", help="Use an offline fake instead of Groq")
+    parser.add_argument("--fake-web", action="store_true", help="Use an offline fake instead of Serper")
+    parser.add_argument("--no-index", action="store_true", help="Skip loading the vector store")
+    parser.add_argument("--fake-limits", nargs=2, type=int, metavar=("RPM", "TPM"),
+                        help="Make the fake LLM reject calls beyond these per-minute limits")
+    args = parser.parse_args(argv)
+
+    errors = [e for e in validate_environment()
+              if not (args.fake_llm and "GROQ" in e) and not (args.fake_web and "SERPER" in e)]
+    if errors:
+        for err in errors:
+            logger.error(f"❌ {err}")
+        return 1
+
+    llm, vector_store, scheduler = build_backends(args.fake_llm, args.fake_web, not args.no_index, args.fake_limits)
+    stats = run_batch(load_questions(args.questions), args.output, llm, vector_store, max(1, args.concurrency), scheduler)
+    logger.info(f"🏁 Batch finished: {stats['answered']} answered, {stats['errors']} errors → {args.output}")
+    return 0 if stats["errors"] == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,24 @@
+import time
 import logging
+import threading
+from collections import deque
 from langchain_groq import ChatGroq
-from utils import GROQ_API_KEY, logger, detect_query_type
+from utils import GROQ_API_KEY, HISTORY_WINDOW, CONTEXT_COMPRESSION, PROFILE_EVERY_N, QUICK_QUESTIONS, logger, detect_query_type
 from search_manager import get_web_context, calculate_search_confidence
+from request_coalescer import SingleFlight, normalize_query
+from answer_cache import AnswerCache
+from profiler import profiled
+from llm_scheduler import PriorityTicket, get_scheduler, invoke_llm
+
+# Identical concurrent queries (e.g. a popular Quick Question) share one computation
+_single_flight = SingleFlight()
+_metrics_lock = threading.Lock()
+_upstream_calls_saved = {"groq": 0, "serper": 0}
+# Finished Quick Question answers, filled ahead of time by the prefetcher. Free-form questions
+# are never cached so web/hybrid answers stay fresh and batch runs measure real calls.
+_answer_cache = AnswerCache()
+_cacheable_queries = {normalize_query(q) for questions in QUICK_QUESTIONS.values() for q in questions}
+_interactive_in_flight = 0
 
 def initialize_groq_llm():
     if not GROQ_API_KEY:
@@ -64,27 +81,37 @@ INSTRUCTIONS:
     }
     return mode_prompts.get(search_mode, mode_prompts["hybrid"])
 
-def generate_response(llm, query, context_documents, web_context, search_mode):
+def generate_response(llm, query, context_documents, web_context, search_mode, priority="interactive", stats=None, scheduler=None):
     try:
         prompt = create_rag_prompt(query, context_documents, web_context, search_mode)
-        response = llm.invoke(prompt)
+        # Admission control keeps concurrent sessions inside Groq's RPM/TPM quotas
+        response, queue_wait = invoke_llm(llm, prompt, priority, scheduler)
+        if stats is not None:
+            stats["llm_queue_ms"] = round(queue_wait * 1000, 1)
         return response.content
     except Exception as e:
         logger.error(f"❌ Error generating response: {str(e)}")
         return f"Error: {str(e)}"
 
-def automatic_search(llm, vector_store, query, chat_history=None):
-    if chat_history is None:
-        chat_history = []
-    detected_mode = detect_query_type(query)
+def _run_search(llm, vector_store, query, detected_mode, priority="interactive", scheduler=None):
+    """Retrieve context, pick the final mode and generate an answer"""
     vector_results, web_context, web_results = [], "", []
+    timings = {}
+    compression = shard_status = None
     
     if vector_store:
         from embedding_manager import search_documents
+        start = time.perf_counter()
         vector_results = search_documents(vector_store, query)
+        timings["retrieval_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if hasattr(vector_store, "last_search_status"):
+            # Sharded mode: which shards (if any) were missing from this search's results
+            shard_status = vector_store.last_search_status()
     
     if detected_mode in ["web_search", "hybrid"]:
+        start = time.perf_counter()
         web_context, web_results = get_web_context(query)
+        timings["web_search_ms"] = round((time.perf_counter() - start) * 1000, 1)
     
     confidence_scores = calculate_search_confidence(query, vector_results, web_results)
     final_mode = max(confidence_scores.items(), key=lambda x: x[1])[0]
@@ -92,7 +119,20 @@ def automatic_search(llm, vector_store, query, chat_history=None):
     if len(vector_results) >= 2 and detected_mode != "web_search" and confidence_scores["vector_search"] > 60:
         final_mode = "vector_search"
     
-    response = generate_response(llm, query, vector_results, web_context, final_mode)
+    context_documents = vector_results
+    # Web-only prompts don't include the documents, so there is nothing to compress
+    if (CONTEXT_COMPRESSION and vector_results and final_mode != "web_search"
+            and getattr(vector_store, "embeddings", None) is not None):
+        from embedding_manager import embed_query_cached
+        from context_compressor import compress_documents
+        # The query vector is already cached from retrieval, so only sentences are embedded here
+        query_vector = embed_query_cached(vector_store.embeddings, query)
+        context_documents, compression = compress_documents(vector_results, query_vector, vector_store.embeddings)
+        timings["compression_ms"] = compression["compression_ms"]
+    
+    start = time.perf_counter()
+    response = generate_response(llm, query, context_documents, web_context, final_mode, priority, timings, scheduler)
+    timings["llm_ms"] = round((time.perf_counter() - start) * 1000, 1)
     
     search_metadata = {
         "mode": final_mode,
@@ -100,8 +140,112 @@ def automatic_search(llm, vector_store, query, chat_history=None):
         "vector_results_count": len(vector_results),
         "web_results_count": len(web_results),
         "detected_mode": detected_mode,
-        "confidence_scores": confidence_scores
+        "confidence_scores": confidence_scores,
+        "timings": timings
     }
+    if shard_status is not None:
+        search_metadata["shard_status"] = shard_status
+    if compression is not None:
+        search_metadata["input_tokens_saved"] = compression["input_tokens_saved"]
+        search_metadata["context_compression"] = compression
+    return response, search_metadata
+
+def _search_and_cache(llm, vector_store, query, detected_mode, key, index_version, priority="interactive", cache=True,
+                      scheduler=None):
+    """Compute an answer and store it in the answer cache unless generation failed"""
+    start = time.perf_counter()
+    response, search_metadata = _run_search(llm, vector_store, query, detected_mode, priority, scheduler)
+    if cache and not response.startswith("Error:"):
+        _answer_cache.put(key, response, search_metadata, index_version, time.perf_counter() - start)
+    return response, search_metadata
+
+def _answer_key(vector_store, query):
+    detected_mode = detect_query_type(query)
+    key = (normalize_query(query), detected_mode)
+    if vector_store is None:
+        # Web-only runs (e.g. batch --no-index) don't need the embedding stack loaded
+        return key, detected_mode, None
+    from embedding_manager import index_fingerprint
+    return key, detected_mode, index_fingerprint(vector_store)
+
+def refresh_answer(llm, vector_store, query):
+    """Recompute a cached answer if it is missing, near expiry or the index changed"""
+    key, detected_mode, index_version = _answer_key(vector_store, query)
+    if not _answer_cache.needs_refresh(key, index_version):
+        return False
+    ticket = PriorityTicket("background")
+    _single_flight.do(
+        key, lambda: _search_and_cache(llm, vector_store, query, detected_mode, key, index_version, ticket),
+        context=(get_scheduler(), ticket),
+    )
+    return True
+
+def interactive_queries_in_flight():
+    """User-facing queries currently running; background work yields while this is non-zero"""
+    with _metrics_lock:
+        return _interactive_in_flight
+
+def get_answer_cache_stats():
+    """Hits, misses and the compute time cache hits saved"""
+    return _answer_cache.stats()
+
+def get_coalescing_stats():
+    """Report how many requests were coalesced and upstream calls saved"""
+    stats = _single_flight.stats()
+    with _metrics_lock:
+        stats["groq_calls_saved"] = _upstream_calls_saved["groq"]
+        stats["serper_calls_saved"] = _upstream_calls_saved["serper"]
+    return stats
+
+@profiled("automatic_search", every_n=PROFILE_EVERY_N)
+def automatic_search(llm, vector_store, query, chat_history=None, session_id=None, priority="interactive", scheduler=None):
+    """Answer a query; `scheduler` overrides the process-wide Groq scheduler (e.g. for offline fakes)"""
+    if chat_history is None:
+        chat_history = deque(maxlen=HISTORY_WINDOW)
+    global _interactive_in_flight
+    key, detected_mode, index_version = _answer_key(vector_store, query)
+    use_cache = priority != "batch" and key[0] in _cacheable_queries
+    
+    start = time.perf_counter()
+    cached = _answer_cache.get(key, index_version) if use_cache else None
+    if cached is not None:
+        response, shared = cached["response"], False
+        # Only the lookup was measured now; the original stage timings are kept separately
+        search_metadata = dict(cached["metadata"], from_cache=True,
+                               cache_age_s=round(time.time() - cached["stored_at"], 1),
+                               timings={"cache_ms": round((time.perf_counter() - start) * 1000, 2)},
+                               cached_timings=cached["metadata"].get("timings", {}))
+    else:
+        interactive = priority == "interactive"
+        if interactive:
+            with _metrics_lock:
+                _interactive_in_flight += 1
+        try:
+            # A user who joins a prefetch or batch computation lifts its queued LLM call to their priority
+            ticket = PriorityTicket(priority)
+            scheduler = scheduler or get_scheduler()
+            (response, search_metadata), shared = _single_flight.do(
+                key, lambda: _search_and_cache(llm, vector_store, query, detected_mode, key, index_version, ticket,
+                                               use_cache, scheduler),
+                context=(scheduler, ticket),
+                # The leader's ticket is queued in the leader's scheduler, so promote it there
+                on_join=lambda leader: leader[0].promote(leader[1], ticket.level),
+            )
+        finally:
+            if interactive:
+                with _metrics_lock:
+                    _interactive_in_flight -= 1
+    if shared:
+        with _metrics_lock:
+            _upstream_calls_saved["groq"] += 1
+            if detected_mode in ["web_search", "hybrid"]:
+                _upstream_calls_saved["serper"] += 1
+    # Each caller gets its own copy so per-session edits don't leak across sessions
+    search_metadata = dict(search_metadata, coalesced=shared)
     
-    chat_history.append({"question": query, "answer": response, "metadata": search_metadata})
+    turn = {"question": query, "answer": response, "metadata": search_metadata}
+    if session_id is not None:
+        from conversation_store import get_conversation_store
+        turn["id"] = get_conversation_store().append(session_id, query, response, search_metadata)
+    chat_history.append(turn)
     return response, chat_history, search_metadata
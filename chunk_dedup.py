@@ -0,0 +1,125 @@
+import re
+import time
+import zlib
+import numpy as np
+from utils import DEDUP_THRESHOLD, logger
+
+NUM_PERM = 128     # MinHash signature length
+SHINGLE_SIZE = 5   # Words per shingle
+_SEED = 1234
+
+_rng = np.random.default_rng(_SEED)
+# Multiply-add-shift family for 32-bit keys: h(x) = ((a*x + b) mod 2^64) >> 32 with 64-bit a, b.
+# a and b must span the full 64 bits: with a < 2^32 the product never wraps, h is monotonic in x
+# and every "permutation" picks the same minimum shingle.
+_A = _rng.integers(0, 2**64, size=NUM_PERM, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_B = _rng.integers(0, 2**64, size=NUM_PERM, dtype=np.uint64, endpoint=False)
+_MAX_HASH = np.uint64(2**32 - 1)
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.fromiter({zlib.crc32(g.encode("utf-8")) for g in grams}, dtype=np.uint64)
+
+def minhash_signature(text):
+    """MinHash signature of a chunk's word shingles"""
+    shingles = _shingles(text)
+    if len(shingles) == 0:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        hashed = (np.outer(_A, shingles) + _B[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1)
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """Pick (bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to the threshold"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+def _source_label(metadata):
+    name = metadata.get("file_name") or metadata.get("source", "unknown")
+    page = metadata.get("page")
+    return f"{name}#p{page}" if page is not None else name
+
+def find_duplicate_groups(texts, threshold=DEDUP_THRESHOLD):
+    """Map each canonical index to the indices of its near-duplicates
+
+    Chunks are visited in ingestion order and each one is compared with the canonical chunks
+    it shares an LSH band with. Every duplicate is confirmed against its canonical directly,
+    so grouping is not transitive: A~B and B~C does not put C with A unless C~A too.
+    """
+    bands, rows = lsh_params(threshold)
+    buckets = [{} for _ in range(bands)]  # band key -> canonical indices, earliest first
+    canonical_signatures = {}
+    groups = {}
+
+    for i, text in enumerate(texts):
+        signature = minhash_signature(text)
+        keys = [signature[b * rows:(b + 1) * rows].tobytes() for b in range(bands)]
+
+        candidates = sorted({c for b, key in enumerate(keys) for c in buckets[b].get(key, ())})
+        canonical = next(
+            # LSH only proposes candidates; confirm with the estimated Jaccard similarity
+            (c for c in candidates if np.mean(canonical_signatures[c] == signature) >= threshold),
+            None,
+        )
+        if canonical is None:
+            canonical = i
+            canonical_signatures[i] = signature
+        else:
+            groups.setdefault(canonical, []).append(i)
+        # Index this chunk's bands under its canonical so later near-copies of it still find one
+        for b, key in enumerate(keys):
+            bucket = buckets[b].setdefault(key, [])
+            if canonical not in bucket:
+                bucket.append(canonical)
+    return groups
+
+def deduplicate_chunks(chunks, threshold=DEDUP_THRESHOLD):
+    """Collapse near-duplicate chunks into one canonical chunk that records the other sources
+
+    Accepts a list of Documents or an offset_chunker.ChunkTable and returns the same kind.
+    """
+    start = time.perf_counter()
+    is_table = hasattr(chunks, "select")
+    texts = (chunks.text(i) for i in range(len(chunks))) if is_table else (c.page_content for c in chunks)
+    groups = find_duplicate_groups(texts, threshold)
+
+    dropped = set()
+    for canonical, duplicates in groups.items():
+        metadata_of = chunks.metadata if is_table else (lambda i: chunks[i].metadata)
+        # Chroma metadata values must be scalars, so the sources are joined into one string
+        annotation = {
+            "duplicate_sources": "; ".join(_source_label(metadata_of(i)) for i in duplicates),
+            "duplicate_count": len(duplicates),
+        }
+        if is_table:
+            chunks.annotate(canonical, annotation)
+        else:
+            chunks[canonical].metadata.update(annotation)
+        dropped.update(duplicates)
+
+    keep = [i for i in range(len(chunks)) if i not in dropped]
+    kept = chunks.select(keep) if is_table else [chunks[i] for i in keep]
+    stats = {
+        "input_chunks": len(chunks),
+        "output_chunks": len(kept),
+        "dropped_chunks": len(dropped),
+        "dedup_ratio": round(len(dropped) / len(chunks), 4) if chunks else 0.0,
+        "threshold": threshold,
+        "dedup_seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(
+        f"🧹 Dropped {len(dropped)}/{len(chunks)} near-duplicate chunks "
+        f"({stats['dedup_ratio']:.1%}) in {stats['dedup_seconds']}s"
+    )
+    return kept, stats
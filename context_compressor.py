@@ -0,0 +1,84 @@
+import re
+import time
+import numpy as np
+from langchain_core.documents import Document
+from utils import COMPRESSION_MAX_SENTENCES, estimate_tokens
+
+# Sentence ends, plus line breaks: PDF text often puts headings and list items on their own line
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+_ABBREVIATIONS = {"dr.", "mr.", "mrs.", "ms.", "prof.", "st.", "no.", "vs.", "fig.", "eq.", "al.", "e.g.", "i.e.", "etc."}
+MIN_SENTENCE_CHARS = 4
+
+def split_sentences(text):
+    """Split chunk text into sentences without losing any of it
+
+    A fragment that ends in a known abbreviation ("Dr.") or is too short to stand alone is
+    joined to the following sentence, so kept sentences are never rewritten.
+    """
+    sentences, pending = [], ""
+    for part in _SENTENCE_BOUNDARY.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        part = f"{pending} {part}" if pending else part
+        if len(part) < MIN_SENTENCE_CHARS or part.rsplit(None, 1)[-1].lower() in _ABBREVIATIONS:
+            pending = part
+            continue
+        sentences.append(part)
+        pending = ""
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+def compress_documents(documents, query_vector, embeddings, max_sentences=COMPRESSION_MAX_SENTENCES, neighbours=1):
+    """Keep the sentences most similar to the query (plus neighbours), in original order
+
+    All sentences are embedded in one batch and scored against the existing query
+    vector with a single matrix product.
+    """
+    start = time.perf_counter()
+    sentences, owners = [], []
+    per_doc = [split_sentences(doc.page_content) for doc in documents]
+    for doc_idx, doc_sentences in enumerate(per_doc):
+        for sent_idx, sentence in enumerate(doc_sentences):
+            sentences.append(sentence)
+            owners.append((doc_idx, sent_idx))
+
+    tokens_before = sum(estimate_tokens(doc.page_content) for doc in documents)
+    if len(sentences) <= max_sentences:
+        return documents, {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_before,
+            "input_tokens_saved": 0,
+            "sentences_kept": len(sentences),
+            "sentences_total": len(sentences),
+            "compression_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    vectors = np.asarray(embeddings.embed_documents(sentences), dtype=np.float32)
+    q = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(q) or 1.0)
+    scores = (vectors @ q) / np.where(norms == 0, 1.0, norms)
+
+    keep = set()
+    for i in np.argsort(-scores)[:max_sentences]:
+        doc_idx, sent_idx = owners[i]
+        for j in range(sent_idx - neighbours, sent_idx + neighbours + 1):
+            if 0 <= j < len(per_doc[doc_idx]):
+                keep.add((doc_idx, j))
+
+    compressed = []
+    for doc_idx, doc in enumerate(documents):
+        kept = [s for j, s in enumerate(per_doc[doc_idx]) if (doc_idx, j) in keep]
+        if kept:
+            compressed.append(Document(page_content=" ".join(kept), metadata=dict(doc.metadata, compressed=True)))
+
+    tokens_after = sum(estimate_tokens(doc.page_content) for doc in compressed)
+    return compressed, {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "input_tokens_saved": tokens_before - tokens_after,
+        "sentences_kept": len(keep),
+        "sentences_total": len(sentences),
+        "compression_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
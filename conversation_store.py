@@ -0,0 +1,106 @@
+import json
+import sqlite3
+import threading
+from collections import deque
+from utils import CONVERSATION_DB_PATH, HISTORY_WINDOW, logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    created_at REAL NOT NULL DEFAULT (strftime('%s', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_id, id);
+"""
+
+class ConversationStore:
+    """SQLite-backed conversation log with a bounded in-memory window per session"""
+
+    def __init__(self, db_path=CONVERSATION_DB_PATH, window=HISTORY_WINDOW):
+        self.db_path = db_path
+        self.window = window
+        self._lock = threading.Lock()
+        # One connection shared across Streamlit session threads, serialised by the lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        logger.info(f"✅ Conversation store ready at {db_path}")
+
+    @staticmethod
+    def _to_turn(row):
+        turn_id, question, answer, metadata = row
+        return {"id": turn_id, "question": question, "answer": answer, "metadata": json.loads(metadata)}
+
+    def append(self, session_id, question, answer, metadata=None):
+        """Persist one turn and return its id"""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO turns (session_id, question, answer, metadata) VALUES (?, ?, ?, ?)",
+                (session_id, question, answer, json.dumps(metadata or {}, default=str)),
+            )
+            self._conn.commit()
+            return cur.lastrowid
+
+    def recent(self, session_id, limit=None):
+        """Return the newest turns of a session, oldest first"""
+        limit = limit or self.window
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, answer, metadata FROM turns "
+                "WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [self._to_turn(r) for r in reversed(rows)]
+
+    def older(self, session_id, before_id, limit=None):
+        """Lazily page turns written before `before_id`, oldest first"""
+        limit = limit or self.window
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, answer, metadata FROM turns "
+                "WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (session_id, before_id, limit),
+            ).fetchall()
+        return [self._to_turn(r) for r in reversed(rows)]
+
+    def between(self, session_id, start_id, before_id):
+        """Turns with start_id <= id < before_id, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, answer, metadata FROM turns "
+                "WHERE session_id = ? AND id >= ? AND id < ? ORDER BY id",
+                (session_id, start_id, before_id),
+            ).fetchall()
+        return [self._to_turn(r) for r in rows]
+
+    def count(self, session_id):
+        """Total number of persisted turns for a session"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM turns WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def clear(self, session_id):
+        """Delete every turn of a session"""
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def load_window(self, session_id):
+        """Bounded in-memory window seeded with the newest persisted turns"""
+        return deque(self.recent(session_id), maxlen=self.window)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_conversation_store():
+    """Process-wide conversation store shared by all sessions"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConversationStore()
+        return _store
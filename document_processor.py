@@ -2,7 +2,10 @@ import os
 import logging
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from utils import CHUNK_SIZE, CHUNK_OVERLAP, DOCUMENTS_FOLDER, logger
+from chunk_dedup import deduplicate_chunks
+from offset_chunker import ChunkTable
+from profiler import profiled
+from utils import CHUNK_SIZE, CHUNK_OVERLAP, CHUNKER, DEDUP_THRESHOLD, DOCUMENTS_FOLDER, logger
 
 def load_documents_from_folder(folder_path):
     """Load all documents from folder and subfolders"""
@@ -44,26 +47,38 @@ def load_documents_from_folder(folder_path):
 
     return all_documents
 
+@profiled("process_documents")
 def process_documents():
-    """Process all documents into chunks"""
+    """Process all documents into chunks; returns (chunks, folder_stats, dedup_stats or None)"""
     documents = load_documents_from_folder(DOCUMENTS_FOLDER)
 
     if not documents:
         raise ValueError("No documents found in the documents folder")
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-    )
-
-    chunks = text_splitter.split_documents(documents)
+    if CHUNKER == "offset":
+        # Offsets into one buffer per source; Documents are built lazily when batches are embedded
+        chunks = ChunkTable.from_documents(documents, CHUNK_SIZE, CHUNK_OVERLAP)
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            length_function=len,
+        )
+        chunks = text_splitter.split_documents(documents)
+
+    # Collapse repeated boilerplate and overlapping revisions before anything is embedded
+    dedup_stats = None
+    if DEDUP_THRESHOLD > 0:
+        chunks, dedup_stats = deduplicate_chunks(chunks, DEDUP_THRESHOLD)
 
     # Folder statistics
-    folder_stats = {}
-    for doc in chunks:
-        folder = doc.metadata.get('folder', 'Unknown')
-        folder_stats[folder] = folder_stats.get(folder, 0) + 1
+    if isinstance(chunks, ChunkTable):
+        folder_stats = chunks.count_by('folder')
+    else:
+        folder_stats = {}
+        for doc in chunks:
+            folder = doc.metadata.get('folder', 'Unknown')
+            folder_stats[folder] = folder_stats.get(folder, 0) + 1
 
     logger.info(f"📑 Created {len(chunks)} chunks from {len(documents)} documents across {len(folder_stats)} folders")
-    return chunks, folder_stats
+    return chunks, folder_stats, dedup_stats
@@ -1,12 +1,31 @@
 import os
+import json
+import time
 import logging
 import shutil
+import threading
+from collections import OrderedDict
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
-from utils import EMBEDDING_MODEL, VECTOR_STORE_PATH, TOP_K_RESULTS, logger
+from profiler import profiled
+from search_tuner import set_search_ef
+from utils import EMBEDDING_MODEL, VECTOR_STORE_PATH, SNAPSHOT_PATH, SEARCH_SETTINGS_PATH, TOP_K_RESULTS, NUM_SHARDS, logger
 
 BATCH_SIZE = 500  # Create embeddings in batches to avoid memory issues
 
+# Overridden by SEARCH_SETTINGS_PATH (written by search_tuner.py) when a store is loaded
+DEFAULT_SEARCH_SETTINGS = {
+    "top_k": TOP_K_RESULTS,
+    "fetch_k": TOP_K_RESULTS,   # candidate pool requested from the index before filtering
+    "score_threshold": 0.6,
+    "search_ef": None,          # HNSW query-time breadth (Chroma only); None means Chroma's default
+}
+_search_settings = dict(DEFAULT_SEARCH_SETTINGS)
+
+QUERY_EMBEDDING_CACHE_SIZE = 512
+_query_vectors = OrderedDict()
+_query_vectors_lock = threading.Lock()
+
 def initialize_embeddings():
     """Initialize CPU-efficient HuggingFace embeddings"""
     try:
@@ -21,8 +40,39 @@ def initialize_embeddings():
         logger.error(f"❌ Error initializing embeddings: {str(e)}")
         raise
 
-def create_vector_store(documents, embeddings):
-    """Create vector store incrementally in batches"""
+def load_search_settings(path=SEARCH_SETTINGS_PATH):
+    """Read tuned search parameters, falling back to the defaults for anything missing"""
+    settings = dict(DEFAULT_SEARCH_SETTINGS)
+    if not os.path.exists(path):
+        return settings
+    try:
+        with open(path, encoding="utf-8") as f:
+            tuned = json.load(f)
+        settings.update({key: tuned[key] for key in DEFAULT_SEARCH_SETTINGS if key in tuned})
+        logger.info(f"✅ Loaded search settings from {path}: {settings}")
+    except Exception as e:
+        logger.error(f"❌ Error reading search settings {path}: {str(e)}")
+    return settings
+
+def apply_search_settings(vector_store, settings=None):
+    """Make `settings` the ones search_documents uses and push search_ef to a Chroma index"""
+    global _search_settings
+    _search_settings = settings or load_search_settings()
+    search_ef = _search_settings.get("search_ef")
+    if hasattr(vector_store, "_collection"):
+        try:
+            # Always applied, so choosing None resets a value left by earlier settings
+            set_search_ef(vector_store, search_ef)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not set hnsw:search_ef={search_ef}: {str(e)}")
+    return _search_settings
+
+def get_search_settings():
+    return dict(_search_settings)
+
+@profiled("create_vector_store")
+def create_vector_store(documents, embeddings, dedup_stats=None):
+    """Create vector store incrementally in batches; `dedup_stats` comes from process_documents"""
     try:
         # Clear existing store
         if os.path.exists(VECTOR_STORE_PATH):
@@ -34,6 +84,7 @@ def create_vector_store(documents, embeddings):
         )
 
         logger.info(f"Creating vector store in batches of {BATCH_SIZE}...")
+        start = time.perf_counter()
 
         for i in range(0, len(documents), BATCH_SIZE):
             batch = documents[i:i + BATCH_SIZE]
@@ -41,16 +92,41 @@ def create_vector_store(documents, embeddings):
             logger.info(f"✅ Added batch {i // BATCH_SIZE + 1} ({len(batch)} docs)")
 
         vector_store.persist()
-        logger.info(f"✅ Vector store created with {len(documents)} documents")
+        apply_search_settings(vector_store)
+        elapsed = time.perf_counter() - start
+        logger.info(f"✅ Vector store created with {len(documents)} documents in {elapsed:.1f}s")
+
+        if dedup_stats and dedup_stats.get("dropped_chunks") and documents:
+            saved = dedup_stats["dropped_chunks"] * elapsed / len(documents)
+            logger.info(f"🧹 Dedup skipped {dedup_stats['dropped_chunks']} chunks, saving ~{saved:.1f}s of embedding")
         return vector_store
 
     except Exception as e:
         logger.error(f"❌ Error creating vector store: {str(e)}")
         raise
 
+def load_snapshot_store(embeddings, path=SNAPSHOT_PATH):
+    """Memory-map a snapshot file; returns None if absent or built with another config"""
+    if not os.path.exists(path):
+        return None
+    try:
+        from index_snapshot import SnapshotVectorStore
+        vector_store = SnapshotVectorStore(path, embeddings)
+        logger.info(f"✅ Memory-mapped snapshot with {len(vector_store)} documents")
+        return vector_store
+    except Exception as e:
+        logger.error(f"❌ Ignoring snapshot {path}: {str(e)}")
+        return None
+
 def load_vector_store(embeddings):
     """Load existing vector store if available"""
     try:
+        # A shipped snapshot starts near-instantly, so prefer it over the Chroma directory
+        vector_store = load_snapshot_store(embeddings)
+        if vector_store is not None:
+            apply_search_settings(vector_store)
+            return vector_store
+
         if not os.path.exists(VECTOR_STORE_PATH):
             return None
 
@@ -63,21 +139,77 @@ def load_vector_store(embeddings):
             return None
 
         logger.info(f"✅ Loaded vector store with {doc_count} documents")
+        apply_search_settings(vector_store)
         return vector_store
 
     except Exception as e:
         logger.error(f"❌ Error loading vector store: {str(e)}")
         return None
 
-def search_documents(vector_store, query, k=TOP_K_RESULTS):
+def shard_vector_store(vector_store, embeddings, num_shards=NUM_SHARDS):
+    """Spread the index over worker processes when sharded mode is enabled"""
+    if not num_shards or vector_store is None:
+        return vector_store
+    try:
+        from shard_manager import get_sharded_store
+        return get_sharded_store(vector_store, embeddings, num_shards)
+    except Exception as e:
+        logger.error(f"❌ Sharded mode unavailable, using single index: {str(e)}")
+        return vector_store
+
+def embed_query_cached(embeddings, query):
+    """Embed a query once; repeated and prefetched queries reuse the vector"""
+    key = (EMBEDDING_MODEL, query)
+    with _query_vectors_lock:
+        if key in _query_vectors:
+            _query_vectors.move_to_end(key)
+            return _query_vectors[key]
+    vector = embeddings.embed_query(query)
+    with _query_vectors_lock:
+        _query_vectors[key] = vector
+        while len(_query_vectors) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_vectors.popitem(last=False)
+    return vector
+
+def index_fingerprint(vector_store):
+    """Identifier that changes whenever the underlying index is rebuilt or replaced"""
+    if vector_store is None:
+        return None
+    manifest = getattr(vector_store, "manifest", None)
+    if manifest:
+        return manifest["sha256"]
+    try:
+        collection = vector_store._collection
+        return f"{collection.id}:{collection.count()}"
+    except Exception:
+        return f"{type(vector_store).__name__}:{len(vector_store)}"
+
+def _search_by_vector(vector_store, query_vector, k):
+    """[(Document, relevance)] for a precomputed query vector on any supported store"""
+    if hasattr(vector_store, "search_by_vector"):
+        return vector_store.search_by_vector(query_vector, k)
+    # Chroma returns raw distances here; map them the same way its text search does
+    relevance = vector_store._select_relevance_score_fn()
+    return [(doc, relevance(distance)) for doc, distance in
+            vector_store.similarity_search_by_vector_with_relevance_scores(query_vector, k=k)]
+
+def search_documents(vector_store, query, k=None):
     """Search for relevant documents"""
     try:
         if vector_store is None:
             return []
 
-        results = vector_store.similarity_search_with_relevance_scores(query, k=k)
-        filtered_results = [doc for doc, score in results if score > 0.6]
-        return filtered_results
+        settings = _search_settings
+        k = k or settings["top_k"]
+        # A larger candidate pool than k raises recall on approximate indexes
+        fetch_k = max(k, settings["fetch_k"])
+        embeddings = getattr(vector_store, "embeddings", None)
+        if embeddings is not None:
+            results = _search_by_vector(vector_store, embed_query_cached(embeddings, query), fetch_k)
+        else:
+            results = vector_store.similarity_search_with_relevance_scores(query, k=fetch_k)
+        filtered_results = [doc for doc, score in results if score > settings["score_threshold"]]
+        return filtered_results[:k]
 
     except Exception as e:
         logger.error(f"❌ Error searching documents: {str(e)}")
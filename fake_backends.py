@@ -0,0 +1,63 @@
+import time
+import zlib
+import threading
+from dataclasses import dataclass, field
+from utils import estimate_tokens
+
+@dataclass
+class FakeResponse:
+    content: str
+    response_metadata: dict = field(default_factory=dict)
+
+class FakeLLM:
+    """Offline stand-in for ChatGroq: deterministic answers after a fixed latency"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        question = prompt.split("QUESTION:", 1)[-1].split("\n", 2)[0].strip()
+        content = f"[fake answer #{zlib.crc32(prompt.encode('utf-8')):08x}] {question}"
+        usage = {"total_tokens": estimate_tokens(prompt) + estimate_tokens(content)}
+        return FakeResponse(content=content, response_metadata={"token_usage": usage})
+
+class RateLimitedFakeLLM(FakeLLM):
+    """FakeLLM that enforces RPM/TPM token buckets like the provider and raises 429s past them"""
+
+    def __init__(self, rpm, tpm, period=60.0, latency=0.05):
+        super().__init__(latency)
+        self.rpm, self.tpm, self.period = rpm, tpm, period
+        self._requests, self._tokens = float(rpm), float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def invoke(self, prompt):
+        with self._lock:
+            now = time.monotonic()
+            elapsed, self._updated = now - self._updated, now
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / self.period)
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / self.period)
+            tokens = estimate_tokens(prompt)
+            if self._requests < 1 or self._tokens < tokens:
+                self.rejected += 1
+                raise RuntimeError("Error code: 429 - rate limit exceeded")
+            self._requests -= 1
+            self._tokens -= tokens
+        return super().invoke(prompt)
+
+def fake_google_search(query, num_results=5, latency=0.02):
+    """Offline stand-in for google_search returning Serper-shaped results"""
+    time.sleep(latency)
+    return [
+        {
+            "title": f"Result {i} for {query}",
+            "link": f"https://example.com/{zlib.crc32(query.encode('utf-8')):08x}/{i}",
+            "snippet": f"Snippet {i} about {query}.",
+            "position": i,
+        }
+        for i in range(1, num_results + 1)
+    ]
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from langchain_core.documents import Document
+from utils import EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, CHUNKER, DEDUP_THRESHOLD, VECTOR_STORE_PATH, SNAPSHOT_PATH, logger
+
+# File layout: 16-byte header | manifest JSON | payload (sections aligned to ALIGNMENT)
+MAGIC = b"RAGSNAP\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_HEADER = struct.Struct("<8sII")  # magic, format version, manifest length
+
+def index_config():
+    """Settings a snapshot must have been built with to be usable by this process"""
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "chunker": CHUNKER,
+        "dedup_threshold": DEDUP_THRESHOLD,
+    }
+
+def _pad(length):
+    return (-length) % ALIGNMENT
+
+def _euclidean_relevance(sq_distances):
+    """Same score LangChain's Chroma wrapper reports for its default L2 space"""
+    return 1.0 - sq_distances / np.sqrt(2)
+
+def top_k_relevance(vectors, sq_norms, query_vector, k):
+    """Exact top-k by squared L2 distance, returned as (indices, relevance scores)"""
+    if len(vectors) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    q = np.asarray(query_vector, dtype=np.float32)
+    sq_distances = sq_norms - 2.0 * (vectors @ q) + float(q @ q)
+    k = min(k, len(sq_distances))
+    idx = np.argpartition(sq_distances, k - 1)[:k]
+    idx = idx[np.argsort(sq_distances[idx])]
+    return idx, _euclidean_relevance(sq_distances[idx])
+
+def _encode_strings(values):
+    """Pack strings into one UTF-8 blob plus int64 end offsets"""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+def write_snapshot(path, vectors, texts, metadatas, config=None):
+    """Write vectors, chunk texts and metadata into one versioned, checksummed file"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or len(vectors) != len(texts) or len(texts) != len(metadatas):
+        raise ValueError("vectors, texts and metadatas must describe the same chunks")
+
+    sq_norms = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+    text_offsets, text_blob = _encode_strings(texts)
+    meta_offsets, meta_blob = _encode_strings([json.dumps(m or {}, default=str) for m in metadatas])
+
+    # Sections in payload order; each starts on an ALIGNMENT boundary so numpy views are aligned
+    sections = [
+        ("vectors", vectors.tobytes()),
+        ("sq_norms", sq_norms.tobytes()),
+        ("text_offsets", text_offsets.tobytes()),
+        ("texts", text_blob),
+        ("meta_offsets", meta_offsets.tobytes()),
+        ("metadata", meta_blob),
+    ]
+    layout, cursor = {}, 0
+    hasher = hashlib.sha256()
+    for name, data in sections:
+        layout[name] = {"offset": cursor, "length": len(data)}
+        hasher.update(data)
+        hasher.update(b"\0" * _pad(len(data)))
+        cursor += len(data) + _pad(len(data))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.time(),
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "config": config or index_config(),
+        "sections": layout,
+        "payload_length": cursor,
+        "sha256": hasher.hexdigest(),
+    }
+    manifest_bytes = json.dumps(manifest).encode("utf-8")
+    manifest_bytes += b" " * _pad(_HEADER.size + len(manifest_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for _, data in sections:
+            f.write(data)
+            f.write(b"\0" * _pad(len(data)))
+    os.replace(tmp_path, path)
+    logger.info(f"✅ Wrote snapshot {path} ({manifest['count']} chunks, dim {manifest['dim']})")
+    return manifest
+
+def read_manifest(f):
+    """Read and validate the header of an open snapshot file, returning (manifest, payload_start)"""
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise ValueError("Snapshot file is truncated")
+    magic, version, manifest_length = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not an index snapshot file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION})")
+    manifest = json.loads(f.read(manifest_length).decode("utf-8"))
+    return manifest, _HEADER.size + manifest_length
+
+def check_compatible(manifest, config=None):
+    """Raise if the snapshot was built with a different embedding model or chunking config"""
+    expected = config or index_config()
+    actual = manifest.get("config", {})
+    mismatches = [
+        f"{key}: snapshot={actual.get(key)!r}, current={value!r}"
+        for key, value in expected.items() if actual.get(key) != value
+    ]
+    if mismatches:
+        raise ValueError("Snapshot config mismatch - " + "; ".join(mismatches))
+
+def verify_snapshot(path):
+    """Stream the payload through SHA-256 and compare it with the manifest checksum"""
+    with open(path, "rb") as f:
+        manifest, payload_start = read_manifest(f)
+        f.seek(payload_start)
+        hasher = hashlib.sha256()
+        remaining = manifest["payload_length"]
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                raise ValueError("Snapshot payload is truncated")
+            hasher.update(block)
+            remaining -= len(block)
+    if hasher.hexdigest() != manifest["sha256"]:
+        raise ValueError("Snapshot checksum mismatch")
+    return manifest
+
+class SnapshotVectorStore:
+    """Read-only vector store over a memory-mapped snapshot; pages load lazily on access"""
+
+    def __init__(self, path, embeddings, config=None):
+        self.path = path
+        self.embeddings = embeddings
+        self._file = open(path, "rb")
+        try:
+            self.manifest, payload_start = read_manifest(self._file)
+            check_compatible(self.manifest, config)
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        count, dim = self.manifest["count"], self.manifest["dim"]
+        sections = self.manifest["sections"]
+
+        def view(name, dtype, shape=None):
+            start = payload_start + sections[name]["offset"]
+            arr = np.frombuffer(self._mm, dtype=dtype, count=sections[name]["length"] // np.dtype(dtype).itemsize, offset=start)
+            return arr.reshape(shape) if shape else arr
+
+        self.vectors = view("vectors", np.float32, (count, dim))
+        self.sq_norms = view("sq_norms", np.float32)
+        self._text_offsets = view("text_offsets", np.int64)
+        self._meta_offsets = view("meta_offsets", np.int64)
+        self._texts_start = payload_start + sections["texts"]["offset"]
+        self._meta_start = payload_start + sections["metadata"]["offset"]
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def text(self, i):
+        start, end = self._text_offsets[i], self._text_offsets[i + 1]
+        return self._mm[self._texts_start + start:self._texts_start + end].decode("utf-8")
+
+    def metadata(self, i):
+        start, end = self._meta_offsets[i], self._meta_offsets[i + 1]
+        return json.loads(self._mm[self._meta_start + start:self._meta_start + end])
+
+    def document(self, i):
+        """Build a Document for one chunk; only done for results actually returned"""
+        return Document(page_content=self.text(i), metadata=self.metadata(i))
+
+    def search_by_vector(self, query_vector, k):
+        """Return [(Document, relevance)] for the k nearest chunks"""
+        idx, scores = top_k_relevance(self.vectors, self.sq_norms, query_vector, k)
+        return [(self.document(int(i)), float(s)) for i, s in zip(idx, scores)]
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return self.search_by_vector(self.embeddings.embed_query(query), k)
+
+    def contents(self):
+        """All chunks as (vectors, texts, metadatas)"""
+        n = len(self)
+        return self.vectors, [self.text(i) for i in range(n)], [self.metadata(i) for i in range(n)]
+
+    def close(self):
+        """Unmap the file; arrays a caller got from contents() keep the mapping alive until dropped"""
+        # The np.frombuffer views export the mmap's buffer, which must be released before closing it
+        self.vectors = self.sq_norms = self._text_offsets = self._meta_offsets = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # an outside view still exists; the mapping is freed along with it
+        self._file.close()
+
+def read_index_contents(vector_store):
+    """Pull (vectors, texts, metadatas) out of a Chroma or snapshot-backed store"""
+    if hasattr(vector_store, "contents"):
+        return vector_store.contents()
+    data = vector_store._collection.get(include=["embeddings", "documents", "metadatas"])
+    return np.asarray(data["embeddings"], dtype=np.float32), data["documents"], data["metadatas"]
+
+def export_chroma(out_path, persist_directory=VECTOR_STORE_PATH):
+    """Dump the persisted Chroma collection into a snapshot file"""
+    from langchain_community.vectorstores import Chroma
+
+    vectors, texts, metadatas = read_index_contents(Chroma(persist_directory=persist_directory))
+    if not texts:
+        raise ValueError(f"No chunks found in {persist_directory}")
+    return write_snapshot(out_path, vectors, texts, metadatas)
+
+def import_snapshot(src_path, dest_path=SNAPSHOT_PATH):
+    """Verify a shipped snapshot and install it where load_vector_store looks for it"""
+    manifest = verify_snapshot(src_path)
+    check_compatible(manifest)
+    tmp_path = f"{dest_path}.tmp"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+    logger.info(f"✅ Installed snapshot {dest_path} ({manifest['count']} chunks)")
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import a single-file index snapshot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="Write the Chroma index to a snapshot file")
+    p_export.add_argument("path", nargs="?", default=SNAPSHOT_PATH)
+    p_import = sub.add_parser("import", help="Verify a snapshot and install it for this node")
+    p_import.add_argument("path")
+    p_verify = sub.add_parser("verify", help="Check a snapshot's checksum and config")
+    p_verify.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            manifest = export_chroma(args.path)
+        elif args.command == "import":
+            manifest = import_snapshot(args.path)
+        else:
+            manifest = verify_snapshot(args.path)
+            check_compatible(manifest)
+    except Exception as e:
+        logger.error(f"❌ Snapshot {args.command} failed: {str(e)}")
+        return 1
+    print(json.dumps({k: manifest[k] for k in ("count", "dim", "config", "sha256")}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
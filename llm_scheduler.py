@@ -0,0 +1,185 @@
+import time
+import heapq
+import itertools
+import threading
+from utils import GROQ_RPM, GROQ_TPM, COMPLETION_TOKENS_ESTIMATE, INTERACTIVE_RESERVE, estimate_tokens, logger
+
+# Lower value = admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_BACKGROUND = 2
+PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH, "background": PRIORITY_BACKGROUND}
+
+class PriorityTicket:
+    """Priority of one logical call; callers sharing the call may raise it while it is queued"""
+
+    def __init__(self, priority="interactive"):
+        self.level = priority if isinstance(priority, int) else PRIORITIES.get(priority, PRIORITY_INTERACTIVE)
+        self.entry = None  # heap entry while waiting in LLMScheduler.admit
+
+class TokenBucket:
+    """Refills continuously up to `capacity`; may go negative when actual usage exceeds the estimate"""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now, reserve=0.0):
+        """Seconds until `amount` can be taken while leaving `reserve` in the bucket (0 if now)"""
+        self._refill(now)
+        needed = min(amount + reserve, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Refund (positive) or charge (negative) after the real usage is known"""
+        self.level = min(self.capacity, self.level + delta)
+
+class LLMScheduler:
+    """Process-wide admission control: requests/min and tokens/min buckets plus a priority queue
+
+    Batch and background calls are only admitted while `reserve` (a fraction of each bucket)
+    would remain afterwards, so a burst of them can't make the next interactive call wait.
+    """
+
+    def __init__(self, rpm=GROQ_RPM, tpm=GROQ_TPM, period=60.0, headroom=0.9, reserve=INTERACTIVE_RESERVE):
+        self.requests = TokenBucket(rpm * headroom, period)
+        self.tokens = TokenBucket(tpm * headroom, period)
+        self.reserve = reserve
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._stats = {"admitted": 0, "total_wait_s": 0.0, "max_wait_s": 0.0}
+
+    def admit(self, estimated_tokens, priority=PRIORITY_INTERACTIVE):
+        """Block until the call may go out; returns the seconds spent queued
+
+        `priority` is a level or a PriorityTicket whose level can be raised via `promote`.
+        """
+        ticket = priority if isinstance(priority, PriorityTicket) else PriorityTicket(priority)
+        start = time.monotonic()
+        with self._cond:
+            entry = [ticket.level, next(self._seq)]
+            ticket.entry = entry
+            heapq.heappush(self._queue, entry)
+            while True:
+                now = time.monotonic()
+                if self._queue[0] is entry:
+                    # Re-read every pass: a follower may have promoted the ticket while it waited
+                    share = 0.0 if ticket.level == PRIORITY_INTERACTIVE else self.reserve
+                    delay = max(
+                        self.requests.wait_time(1, now, share * self.requests.capacity),
+                        self.tokens.wait_time(estimated_tokens, now, share * self.tokens.capacity),
+                    )
+                    if delay == 0.0:
+                        self.requests.take(1, now)
+                        self.tokens.take(estimated_tokens, now)
+                        heapq.heappop(self._queue)
+                        ticket.entry = None
+                        break
+                    self._cond.wait(delay)
+                else:
+                    # Not at the head: wake when the queue changes
+                    self._cond.wait()
+            waited = time.monotonic() - start
+            self._stats["admitted"] += 1
+            self._stats["total_wait_s"] += waited
+            self._stats["max_wait_s"] = max(self._stats["max_wait_s"], waited)
+            self._cond.notify_all()
+        return waited
+
+    def promote(self, ticket, priority):
+        """Raise a ticket to `priority` (never lowers it), re-ordering the queue if it is waiting"""
+        level = priority if isinstance(priority, int) else PRIORITIES.get(priority, PRIORITY_INTERACTIVE)
+        with self._cond:
+            if level >= ticket.level:
+                return
+            ticket.level = level
+            if ticket.entry is not None:
+                ticket.entry[0] = level
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the provider reports real usage"""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def penalize(self):
+        """Empty both buckets after a provider rate-limit error so everyone backs off"""
+        with self._cond:
+            now = time.monotonic()
+            self.requests.take(self.requests.capacity, now)
+            self.tokens.take(self.tokens.capacity, now)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats, queued=len(self._queue))
+        stats["avg_wait_s"] = round(stats["total_wait_s"] / stats["admitted"], 3) if stats["admitted"] else 0.0
+        return stats
+
+class UnlimitedScheduler(LLMScheduler):
+    """Admits every call at once; for offline fakes that have no provider quota"""
+
+    def __init__(self):
+        super().__init__(rpm=1, tpm=1)
+
+    def admit(self, estimated_tokens, priority=PRIORITY_INTERACTIVE):
+        with self._cond:
+            self._stats["admitted"] += 1
+        return 0.0
+
+def estimate_call_tokens(prompt):
+    """Prompt tokens plus the expected completion, which counts against the TPM quota too"""
+    return estimate_tokens(prompt) + COMPLETION_TOKENS_ESTIMATE
+
+def _usage_tokens(response):
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    return usage.get("total_tokens")
+
+def is_rate_limit_error(error):
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "rate_limit" in text
+
+_scheduler = LLMScheduler()
+
+def get_scheduler():
+    return _scheduler
+
+def invoke_llm(llm, prompt, priority="interactive", scheduler=None):
+    """llm.invoke behind the admission scheduler; returns (response, queue wait seconds)
+
+    `priority` is a name from PRIORITIES or a PriorityTicket shared with coalesced callers.
+    """
+    scheduler = scheduler or _scheduler
+    ticket = priority if isinstance(priority, PriorityTicket) else PriorityTicket(priority)
+    estimated = estimate_call_tokens(prompt)
+    waited = scheduler.admit(estimated, ticket)
+    try:
+        response = llm.invoke(prompt)
+    except Exception as e:
+        if not is_rate_limit_error(e):
+            raise
+        # The provider disagreed with our estimate: back everyone off and retry once through the queue
+        logger.warning(f"⚠️ Groq rate limit hit, re-queueing: {str(e)}")
+        scheduler.penalize()
+        waited += scheduler.admit(estimated, ticket)
+        response = llm.invoke(prompt)
+    scheduler.settle(estimated, _usage_tokens(response))
+    return response, waited
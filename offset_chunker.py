@@ -0,0 +1,158 @@
+import sys
+import time
+import tracemalloc
+from array import array
+from langchain_core.documents import Document
+from utils import CHUNK_SIZE, CHUNK_OVERLAP, DOCUMENTS_FOLDER
+
+SEPARATORS = ("\n\n", "\n", " ")
+
+def split_offsets(text, start, stop, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Yield (start, end) chunk offsets within text[start:stop] without slicing the text"""
+    pos = start
+    while pos < stop:
+        while pos < stop and text[pos].isspace():
+            pos += 1
+        if pos >= stop:
+            break
+
+        end = min(pos + chunk_size, stop)
+        if end < stop:
+            # Prefer the coarsest separator that still leaves a non-empty chunk
+            for sep in SEPARATORS:
+                cut = text.rfind(sep, pos + 1, end)
+                if cut > pos:
+                    end = cut
+                    break
+
+        trimmed = end
+        while trimmed > pos and text[trimmed - 1].isspace():
+            trimmed -= 1
+        yield pos, trimmed
+
+        if end >= stop:
+            break
+        # Step back by the overlap, then forward to a word boundary so chunks don't start mid-word
+        nxt = end - chunk_overlap
+        if nxt <= pos:
+            nxt = end
+        else:
+            space = text.find(" ", nxt, end)
+            if space != -1:
+                nxt = space + 1
+        pos = nxt
+
+class ChunkTable:
+    """Chunks stored as offsets into one text buffer per source, with columnar metadata
+
+    Each loaded page keeps a single metadata dict shared by all of its chunks; a chunk's
+    `Document` is only materialised when it is read.
+    """
+
+    def __init__(self, buffers, pages, source_id, page_ref, starts, ends, extra=None):
+        self.buffers = buffers        # one contiguous string per source document
+        self.pages = pages            # (source id, metadata dict) per loaded page
+        self.source_id = source_id    # array('i'), per chunk
+        self.page_ref = page_ref      # array('i'), index into pages, per chunk
+        self.starts = starts          # array('q'), per chunk
+        self.ends = ends              # array('q'), per chunk
+        self.extra = extra or {}      # sparse per-chunk metadata (e.g. dedup annotations)
+
+    @classmethod
+    def from_documents(cls, documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+        """Concatenate the pages of each source into one buffer and record chunk offsets"""
+        buffers, pages = [], []
+        source_id, page_ref = array("i"), array("i")
+        starts, ends = array("q"), array("q")
+
+        by_source = {}
+        for doc in documents:
+            by_source.setdefault(doc.metadata.get("source", id(doc)), []).append(doc)
+
+        for source_docs in by_source.values():
+            sid = len(buffers)
+            parts, offset = [], 0
+            for doc in source_docs:
+                pid = len(pages)
+                pages.append((sid, doc.metadata))
+                parts.append(doc.page_content)
+                page_start, offset = offset, offset + len(doc.page_content)
+                # Chunks never cross a page boundary, matching the per-page LangChain splitter
+                for start, end in split_offsets(doc.page_content, 0, len(doc.page_content), chunk_size, chunk_overlap):
+                    source_id.append(sid)
+                    page_ref.append(pid)
+                    starts.append(page_start + start)
+                    ends.append(page_start + end)
+            buffers.append("".join(parts))
+
+        return cls(buffers, pages, source_id, page_ref, starts, ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def text(self, i):
+        return self.buffers[self.source_id[i]][self.starts[i]:self.ends[i]]
+
+    def metadata(self, i):
+        metadata = dict(self.pages[self.page_ref[i]][1])
+        metadata.update(self.extra.get(i, {}))
+        return metadata
+
+    def document(self, i):
+        return Document(page_content=self.text(i), metadata=self.metadata(i))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.document(i) for i in range(*key.indices(len(self)))]
+        return self.document(key)
+
+    def annotate(self, i, values):
+        """Attach extra metadata to one chunk without giving every chunk its own dict"""
+        self.extra.setdefault(i, {}).update(values)
+
+    def select(self, indices):
+        """New table over a subset of chunks, sharing the same buffers and page metadata"""
+        indices = list(indices)
+        remap = {old: new for new, old in enumerate(indices)}
+        return ChunkTable(
+            self.buffers,
+            self.pages,
+            array("i", (self.source_id[i] for i in indices)),
+            array("i", (self.page_ref[i] for i in indices)),
+            array("q", (self.starts[i] for i in indices)),
+            array("q", (self.ends[i] for i in indices)),
+            {remap[i]: v for i, v in self.extra.items() if i in remap},
+        )
+
+    def count_by(self, key):
+        """Chunks per value of a page-level metadata field"""
+        counts = {}
+        for ref in self.page_ref:
+            value = self.pages[ref][1].get(key, "Unknown")
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+
+def benchmark(folder=DOCUMENTS_FOLDER):
+    """Compare throughput and retained memory against RecursiveCharacterTextSplitter"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from document_processor import load_documents_from_folder
+
+    documents = load_documents_from_folder(folder)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function=len)
+    chars = sum(len(d.page_content) for d in documents)
+
+    for name, split in (("recursive", splitter.split_documents), ("offset", ChunkTable.from_documents)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunks = split(documents)
+        elapsed = time.perf_counter() - start
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{name:>9}: {len(chunks):6d} chunks  {chars / elapsed / 1e6:7.2f} MB/s  "
+            f"{retained / max(len(chunks), 1):8.0f} bytes/chunk retained"
+        )
+        del chunks
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:])
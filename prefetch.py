@@ -0,0 +1,58 @@
+import time
+import threading
+from utils import QUICK_QUESTIONS, PREFETCH_INTERVAL, logger
+
+class QuickQuestionPrefetcher:
+    """Low-priority background job keeping Quick Question answers warm in the answer cache"""
+
+    def __init__(self, questions, interval=PREFETCH_INTERVAL):
+        self.questions = questions
+        self.interval = interval
+        self._targets = (None, None)
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {"refreshed": 0, "failed": 0, "deferred_for_users": 0}
+
+    def start(self, llm, vector_store):
+        """Point the job at the current LLM/index and start it if it isn't running"""
+        with self._lock:
+            self._targets = (llm, vector_store)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="quick-question-prefetch", daemon=True)
+                self._thread.start()
+                logger.info(f"🔮 Prefetching {len(self.questions)} quick questions in the background")
+        self._wake.set()
+
+    def _wait_for_idle(self):
+        # Never compete with a user: back off while any interactive query is running
+        from chat_manager import interactive_queries_in_flight
+        while interactive_queries_in_flight() > 0:
+            self.stats["deferred_for_users"] += 1
+            time.sleep(0.5)
+
+    def _run(self):
+        from chat_manager import refresh_answer
+        while True:
+            for question in self.questions:
+                llm, vector_store = self._targets
+                if llm is None:
+                    break
+                self._wait_for_idle()
+                try:
+                    if refresh_answer(llm, vector_store, question):
+                        self.stats["refreshed"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(f"❌ Prefetch failed for '{question}': {str(e)}")
+            # Re-scan periodically so entries are recomputed before their TTL runs out
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+_prefetcher = QuickQuestionPrefetcher([q for questions in QUICK_QUESTIONS.values() for q in questions])
+
+def start_prefetch(llm, vector_store):
+    _prefetcher.start(llm, vector_store)
+
+def get_prefetch_stats():
+    return dict(_prefetcher.stats)
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import functools
+import itertools
+import threading
+from collections import Counter
+from utils import PROFILING, PROFILE_DIR, PROFILE_INTERVAL_MS, logger
+
+# Checked on every call of a @profiled function; when False the wrapper is a single branch
+_enabled = PROFILING
+
+_lock = threading.Lock()
+_active = {}        # thread id -> id of the profiled call it is running
+_samples = {}       # call id -> Counter of folded stacks for that call only
+_pending = {}       # label -> Counter of stacks from finished calls not yet written
+_calls = Counter()  # label -> profiled calls since the last flush
+_call_ids = itertools.count()
+_file_ids = itertools.count()
+_sampler = None
+
+def set_profiling(enabled):
+    """Switch profiling on or off at runtime (e.g. from the sidebar toggle)"""
+    global _enabled
+    _enabled = bool(enabled)
+    logger.info(f"🔬 Profiling {'enabled' if _enabled else 'disabled'} (writing to {PROFILE_DIR})")
+
+def is_profiling_enabled():
+    return _enabled
+
+def _fold(frame):
+    """Collapse a frame chain into root-first `func (file:line);...` form"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+def _sample_loop():
+    global _sampler
+    interval = PROFILE_INTERVAL_MS / 1000.0
+    while True:
+        with _lock:
+            if not _active:
+                _sampler = None
+                return
+            targets = dict(_active)
+        frames = sys._current_frames()
+        with _lock:
+            for thread_id, call_id in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None and call_id in _samples:
+                    _samples[call_id][_fold(frame)] += 1
+        del frames
+        time.sleep(interval)
+
+def _flush(label):
+    """Write accumulated samples for a label as a folded-stack file (flamegraph.pl / speedscope)"""
+    with _lock:
+        samples = _pending.pop(label, None)
+        _calls[label] = 0
+    if not samples:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # Several profiles can finish within one second, so the name also carries ms and a sequence number
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}"
+    path = os.path.join(PROFILE_DIR, f"{label}-{stamp}-{os.getpid()}-{next(_file_ids)}.folded")
+    with open(path, "x", encoding="utf-8") as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    logger.info(f"🔬 Wrote profile {path} ({sum(samples.values())} samples)")
+    return path
+
+def profiled(label, every_n=1):
+    """Sample the calling thread while the function runs; write a profile every `every_n` calls"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+
+            global _sampler
+            thread_id = threading.get_ident()
+            with _lock:
+                nested = thread_id in _active
+                if not nested:
+                    call_id = next(_call_ids)
+                    _active[thread_id] = call_id
+                    _samples[call_id] = Counter()
+                    if _sampler is None:
+                        _sampler = threading.Thread(target=_sample_loop, name="profiler", daemon=True)
+                        _sampler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if not nested:
+                    with _lock:
+                        _active.pop(thread_id, None)
+                        # Only this call's stacks go into the label's profile, not concurrent calls'
+                        _pending.setdefault(label, Counter()).update(_samples.pop(call_id))
+                        _calls[label] += 1
+                        due = _calls[label] >= every_n
+                    if due:
+                        _flush(label)
+        return wrapper
+    return decorator
@@ -0,0 +1,70 @@
+import threading
+from utils import logger
+
+def normalize_query(query):
+    """Normalise a query so trivially different spellings share one key"""
+    return " ".join(query.lower().split())
+
+class _Call:
+    """A single in-flight computation shared by every waiting caller"""
+
+    def __init__(self, context=None):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.context = context  # leader-supplied state followers may act on (e.g. a queue ticket)
+
+class SingleFlight:
+    """Run at most one computation per key; concurrent callers share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"leader_calls": 0, "coalesced_calls": 0}
+
+    def do(self, key, fn, context=None, on_join=None):
+        """Return (result, shared); shared is True when an in-flight call was reused
+
+        `context` is attached to a new call; a caller that joins an existing call has
+        `on_join(leader_context)` run before it starts waiting.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["coalesced_calls"] += 1
+                leader = False
+            else:
+                call = _Call(context)
+                self._calls[key] = call
+                self._stats["leader_calls"] += 1
+                leader = True
+
+        if not leader:
+            logger.info(f"🔗 Coalesced identical in-flight request: {key}")
+            if on_join is not None and call.context is not None:
+                on_join(call.context)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        """Number of distinct computations currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Counters for leader vs coalesced calls"""
+        with self._lock:
+            return dict(self._stats)
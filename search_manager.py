@@ -1,6 +1,14 @@
 import requests
 from utils import SERPER_API_KEY, logger
 
+# Optional replacement for google_search (e.g. an offline fake for batch runs)
+_search_backend = None
+
+def set_search_backend(backend):
+    """Route web searches through `backend(query)`; None restores the Serper API"""
+    global _search_backend
+    _search_backend = backend
+
 def google_search(query, num_results=5):
     if not SERPER_API_KEY:
         raise ValueError("SERPER_API_KEY is not set")
@@ -49,7 +57,8 @@ def format_search_results(results):
     return formatted
 
 def get_web_context(query):
-    results = google_search(query)
+    search = _search_backend or google_search
+    results = search(query)
     return format_search_results(results), results
 
 def calculate_search_confidence(query, vector_results, web_results):
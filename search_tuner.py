@@ -0,0 +1,175 @@
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+from index_snapshot import top_k_relevance, read_index_contents
+from utils import TOP_K_RESULTS, SEARCH_SETTINGS_PATH, logger
+
+FETCH_K_CANDIDATES = [4, 8, 16, 32]
+SEARCH_EF_CANDIDATES = [None, 16, 32, 64, 128]
+THRESHOLD_CANDIDATES = [0.4, 0.5, 0.55, 0.6, 0.65, 0.7]
+CHROMA_DEFAULT_SEARCH_EF = 10  # hnsw:search_ef Chroma uses when the collection doesn't set one
+
+def get_search_ef(vector_store):
+    """Current hnsw:search_ef of a Chroma collection"""
+    return (vector_store._collection.metadata or {}).get("hnsw:search_ef", CHROMA_DEFAULT_SEARCH_EF)
+
+def set_search_ef(vector_store, search_ef):
+    """Set a Chroma collection's hnsw:search_ef (None = Chroma's default); no-op if unchanged"""
+    search_ef = int(search_ef or CHROMA_DEFAULT_SEARCH_EF)
+    if get_search_ef(vector_store) == search_ef:
+        return
+    # hnsw:space can't be re-sent to modify(), so only pass the other keys along
+    metadata = {k: v for k, v in (vector_store._collection.metadata or {}).items() if k != "hnsw:space"}
+    metadata["hnsw:search_ef"] = search_ef
+    vector_store._collection.modify(metadata=metadata)
+
+def sample_queries(texts, n, seed=0):
+    """Smoke-test queries made from the opening words of indexed chunks
+
+    These are not held out: each query's source chunk is in the index, so recall comes out
+    optimistic. Pass real questions with --queries for settings worth keeping.
+    """
+    rng = random.Random(seed)
+    picks = rng.sample(range(len(texts)), min(n, len(texts)))
+    return [" ".join(texts[i].split()[:12]) for i in picks]
+
+def load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [r if isinstance(r, str) else r["question"] for r in records]
+
+def _search(vector_store, query_vector, n):
+    """Raw index search returning [(text, relevance)] without building Documents"""
+    if hasattr(vector_store, "search_by_vector"):
+        return [(doc.page_content, score) for doc, score in vector_store.search_by_vector(query_vector, n)]
+    res = vector_store._collection.query(
+        query_embeddings=[list(map(float, query_vector))], n_results=n, include=["documents", "distances"]
+    )
+    # Same L2 -> relevance mapping LangChain's Chroma wrapper uses
+    return [(text, 1.0 - d / np.sqrt(2)) for text, d in zip(res["documents"][0], res["distances"][0])]
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+def exact_ground_truth(vectors, texts, query_vectors, k, relevance_floor):
+    """Exact top-k above the relevance floor per query, by brute force over every vector"""
+    sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    truth = []
+    for q in query_vectors:
+        idx, scores = top_k_relevance(vectors, sq_norms, q, k)
+        truth.append({texts[i] for i, s in zip(idx, scores) if s > relevance_floor})
+    return truth
+
+def sweep(vector_store, query_vectors, truth, k=TOP_K_RESULTS, thresholds=THRESHOLD_CANDIDATES, repeats=3):
+    """Measure recall@k, precision and p50/p99 latency for every parameter combination
+
+    search_ef candidates are set on the live Chroma collection and its original value is
+    restored afterwards, so only the written settings file changes what the app uses.
+    """
+    has_hnsw = hasattr(vector_store, "_collection")
+    if has_hnsw:
+        original_ef = get_search_ef(vector_store)
+    rows = []
+    try:
+        for search_ef in (SEARCH_EF_CANDIDATES if has_hnsw else [None]):
+            if has_hnsw:
+                set_search_ef(vector_store, search_ef)
+            for fetch_k in FETCH_K_CANDIDATES:
+                if fetch_k < k:
+                    continue
+                latencies, results = [], []
+                for q in query_vectors:
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        hits = _search(vector_store, q, fetch_k)
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    results.append(hits)
+                # The threshold is applied after the search, so it re-uses the same runs
+                for threshold in thresholds:
+                    recalls, precisions = [], []
+                    for hits, expected in zip(results, truth):
+                        returned = [text for text, score in hits if score > threshold][:k]
+                        if expected:
+                            recalls.append(len(expected.intersection(returned)) / len(expected))
+                        if returned:
+                            precisions.append(len(expected.intersection(returned)) / len(returned))
+                    rows.append({
+                        "search_ef": search_ef,
+                        "fetch_k": fetch_k,
+                        "score_threshold": threshold,
+                        "recall": round(float(np.mean(recalls)) if recalls else 1.0, 4),
+                        "precision": round(float(np.mean(precisions)) if precisions else 1.0, 4),
+                        "p50_ms": round(_percentile(latencies, 0.50), 3),
+                        "p99_ms": round(_percentile(latencies, 0.99), 3),
+                    })
+    finally:
+        if has_hnsw:
+            set_search_ef(vector_store, original_ef)
+    return rows
+
+def choose(rows, target_recall):
+    """Fastest p99 among configs meeting the recall target, preferring higher precision"""
+    eligible = [r for r in rows if r["recall"] >= target_recall] or sorted(rows, key=lambda r: -r["recall"])[:1]
+    return min(eligible, key=lambda r: (r["p99_ms"], -r["precision"], -r["recall"]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune vector search parameters for recall vs latency")
+    parser.add_argument("--queries", help="JSONL of held-out questions (default: sample from the index - a smoke test only)")
+    parser.add_argument("--sample", type=int, default=100, help="Queries to sample when --queries is not given")
+    parser.add_argument("--k", type=int, default=TOP_K_RESULTS)
+    parser.add_argument("--relevance-floor", type=float, default=0.6, help="Ground truth keeps exact hits above this relevance")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--output", default=SEARCH_SETTINGS_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing the settings file")
+    args = parser.parse_args(argv)
+
+    from embedding_manager import initialize_embeddings, load_vector_store
+    embeddings = initialize_embeddings()
+    vector_store = load_vector_store(embeddings)
+    if vector_store is None:
+        logger.error("❌ No vector store to tune; initialize the app first")
+        return 1
+
+    vectors, texts, _ = read_index_contents(vector_store)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        logger.warning("⚠️ No --queries given: sampling queries from indexed chunks, so recall is optimistic (smoke test)")
+        queries = sample_queries(texts, args.sample)
+    query_vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    truth = exact_ground_truth(vectors, texts, query_vectors, args.k, args.relevance_floor)
+    logger.info(f"🎯 Ground truth for {len(queries)} queries over {len(texts)} chunks")
+
+    thresholds = sorted(set(THRESHOLD_CANDIDATES) | {args.relevance_floor})
+    rows = sweep(vector_store, query_vectors, truth, args.k, thresholds)
+    print(f"{'ef':>5} {'fetch_k':>7} {'thresh':>6} {'recall':>7} {'prec':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in rows:
+        print(f"{str(r['search_ef']):>5} {r['fetch_k']:>7} {r['score_threshold']:>6} {r['recall']:>7} "
+              f"{r['precision']:>6} {r['p50_ms']:>8} {r['p99_ms']:>8}")
+
+    best = choose(rows, args.target_recall)
+    settings = {
+        "top_k": args.k,
+        "fetch_k": best["fetch_k"],
+        "score_threshold": best["score_threshold"],
+        "search_ef": best["search_ef"],
+        "measured": {key: best[key] for key in ("recall", "precision", "p50_ms", "p99_ms")},
+        "num_queries": len(queries),
+        "query_source": args.queries or "sampled-from-index (smoke test)",
+        "num_chunks": len(texts),
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print(json.dumps(settings, indent=2))
+    if not args.dry_run:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+        logger.info(f"✅ Wrote search settings to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import time
+import zlib
+import heapq
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.documents import Document
+from index_snapshot import top_k_relevance, read_index_contents
+from utils import NUM_SHARDS, logger
+
+SHARD_TIMEOUT = 10.0  # Seconds to wait for a shard before treating it as unhealthy
+LATENCY_WINDOW = 200  # Recent searches kept per shard for p50/p99
+
+def shard_for(chunk_key, num_shards):
+    """Stable shard assignment so rebalancing only depends on the chunk and shard count"""
+    return zlib.crc32(chunk_key.encode("utf-8")) % num_shards
+
+def _shard_worker(conn, shard_id):
+    """Worker process loop: owns one shard and answers load/search/ping/dump/stop messages"""
+    vectors = np.empty((0, 0), dtype=np.float32)
+    sq_norms = np.empty(0, dtype=np.float32)
+    texts, metadatas = [], []
+    while True:
+        try:
+            command, *args = conn.recv()
+        except EOFError:
+            break
+        if command == "load":
+            vectors, texts, metadatas = args
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+            conn.send(("ok", len(texts)))
+        elif command == "search":
+            query_vector, k = args
+            start = time.perf_counter()
+            idx, scores = top_k_relevance(vectors, sq_norms, query_vector, k)
+            hits = [(float(s), texts[i], metadatas[i]) for i, s in zip(idx, scores)]
+            conn.send(("ok", hits, time.perf_counter() - start))
+        elif command == "ping":
+            conn.send(("ok", len(texts)))
+        elif command == "dump":
+            conn.send(("ok", vectors, texts, metadatas))
+        elif command == "stop":
+            conn.send(("ok",))
+            break
+    conn.close()
+
+class _Shard:
+    """Parent-side handle for one worker process"""
+
+    def __init__(self, ctx, shard_id):
+        self.shard_id = shard_id
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_shard_worker, args=(child_conn, shard_id), daemon=True)
+        self.process.start()
+        child_conn.close()
+        # A pipe carries one request/response at a time
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.healthy = True
+        self.count = 0
+
+    def call(self, *message, timeout=SHARD_TIMEOUT):
+        with self.lock:
+            if not self.healthy:
+                raise RuntimeError(f"shard {self.shard_id} is unhealthy")
+            try:
+                self.conn.send(message)
+                if not self.conn.poll(timeout):
+                    raise TimeoutError(f"shard {self.shard_id} did not answer within {timeout}s")
+                reply = self.conn.recv()
+            except Exception:
+                # A late reply would desynchronise the pipe, so the shard stays out until respawned
+                self.healthy = False
+                raise
+        return reply[1:]
+
+    def stop(self):
+        try:
+            self.call("stop", timeout=2.0)
+        except Exception:
+            pass
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+class ShardedVectorStore:
+    """Chunks spread over N worker processes; queries are scattered and per-shard top-k merged
+
+    A shard that fails is respawned in the background and reloaded from `source`, a callable
+    returning (vectors, texts, metadatas); until then searches return partial results.
+    """
+
+    def __init__(self, embeddings, num_shards, vectors=None, texts=None, metadatas=None, source=None):
+        self.embeddings = embeddings
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shards = []
+        self._pool = None
+        self._admin_lock = threading.Lock()
+        self._recovery_lock = threading.Lock()
+        self._recovering = set()
+        self._last = threading.local()
+        self._source = source or (lambda: (vectors, texts or [], metadatas or []))
+        self._start(num_shards)
+        if texts:
+            self._distribute(vectors, texts, metadatas)
+        atexit.register(self.close)
+
+    @classmethod
+    def from_vector_store(cls, vector_store, embeddings, num_shards):
+        vectors, texts, metadatas = read_index_contents(vector_store)
+        # Re-read the index on recovery instead of keeping a second copy in this process
+        return cls(embeddings, num_shards, vectors, texts, metadatas,
+                   source=lambda: read_index_contents(vector_store))
+
+    def _start(self, num_shards):
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        self._shards = [_Shard(self._ctx, i) for i in range(num_shards)]
+        self._pool = ThreadPoolExecutor(max_workers=num_shards, thread_name_prefix="shard")
+        logger.info(f"✅ Started {num_shards} index shard workers")
+
+    def _distribute(self, vectors, texts, metadatas):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n = len(self._shards)
+        assignment = np.array([shard_for(t, n) for t in texts], dtype=np.int64)
+        for shard in self._shards:
+            rows = np.flatnonzero(assignment == shard.shard_id)
+            (shard.count,) = shard.call(
+                "load", vectors[rows], [texts[i] for i in rows], [metadatas[i] for i in rows]
+            )
+        logger.info(f"📦 Distributed {len(texts)} chunks: {[s.count for s in self._shards]}")
+
+    def __len__(self):
+        return sum(s.count for s in self._shards)
+
+    @property
+    def num_shards(self):
+        return len(self._shards)
+
+    def _search_shard(self, shard, query_vector, k):
+        """Hits from one shard, or None if it failed (a respawn is then scheduled)"""
+        start = time.perf_counter()
+        try:
+            hits, _ = shard.call("search", query_vector, k)
+        except Exception as e:
+            if shard.shard_id not in self._recovering:
+                logger.error(f"❌ Shard {shard.shard_id} search failed: {str(e)}")
+            self._schedule_recovery(shard)
+            return None
+        shard.latencies.append(time.perf_counter() - start)
+        return hits
+
+    def search_by_vector(self, query_vector, k):
+        """Scatter the query vector to every shard and merge the per-shard top-k"""
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        shards = list(self._shards)
+        futures = [self._pool.submit(self._search_shard, s, query_vector, k) for s in shards]
+        per_shard = [f.result() for f in futures]
+        failed = [s.shard_id for s, hits in zip(shards, per_shard) if hits is None]
+        self._last.status = {"shards": len(shards), "failed_shards": failed, "partial": bool(failed)}
+        gathered = [hit for hits in per_shard if hits for hit in hits]
+        best = heapq.nlargest(k, gathered, key=lambda hit: hit[0])
+        return [(Document(page_content=text, metadata=meta), score) for score, text, meta in best]
+
+    def last_search_status(self):
+        """Shard outcome of the calling thread's most recent search (None before any search)"""
+        return getattr(self._last, "status", None)
+
+    def _shard_rows(self, num_shards, shard_id):
+        """(vectors, texts, metadatas) the source index assigns to one shard"""
+        vectors, texts, metadatas = self._source()
+        rows = [i for i, t in enumerate(texts) if shard_for(t, num_shards) == shard_id]
+        if not rows:
+            return np.empty((0, 0), dtype=np.float32), [], []
+        return np.asarray(vectors, dtype=np.float32)[rows], [texts[i] for i in rows], [metadatas[i] for i in rows]
+
+    def _schedule_recovery(self, shard):
+        with self._recovery_lock:
+            if shard.shard_id in self._recovering or shard not in self._shards:
+                return
+            self._recovering.add(shard.shard_id)
+        threading.Thread(target=self._recover, args=(shard,), name=f"shard-{shard.shard_id}-recovery",
+                         daemon=True).start()
+
+    def _recover(self, shard):
+        """Replace a failed worker with a fresh process loaded from the source index"""
+        try:
+            shard.stop()
+            with self._admin_lock:
+                if shard not in self._shards:
+                    return  # resized or closed meanwhile
+                replacement = _Shard(self._ctx, shard.shard_id)
+                (replacement.count,) = replacement.call("load", *self._shard_rows(len(self._shards), shard.shard_id))
+                self._shards[self._shards.index(shard)] = replacement
+            logger.info(f"♻️ Respawned shard {shard.shard_id} with {replacement.count} chunks")
+        except Exception as e:
+            logger.error(f"❌ Could not respawn shard {shard.shard_id}: {str(e)}")
+        finally:
+            with self._recovery_lock:
+                self._recovering.discard(shard.shard_id)
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return self.search_by_vector(self.embeddings.embed_query(query), k)
+
+    def health(self):
+        """Per-shard liveness, chunk count and recent search latency"""
+        report = []
+        for shard in list(self._shards):
+            try:
+                (count,) = shard.call("ping", timeout=2.0)
+                alive = True
+            except Exception:
+                count, alive = shard.count, False
+            alive = alive and shard.healthy and shard.process.is_alive()
+            if not alive:
+                self._schedule_recovery(shard)
+            lat_ms = sorted(l * 1000 for l in shard.latencies)
+            report.append({
+                "shard": shard.shard_id,
+                "alive": alive,
+                "recovering": shard.shard_id in self._recovering,
+                "chunks": count,
+                "searches": len(lat_ms),
+                "p50_ms": round(lat_ms[len(lat_ms) // 2], 2) if lat_ms else None,
+                "p99_ms": round(lat_ms[min(len(lat_ms) - 1, int(len(lat_ms) * 0.99))], 2) if lat_ms else None,
+            })
+        return report
+
+    def resize(self, num_shards):
+        """Rebalance every chunk onto a new number of shards"""
+        with self._admin_lock:
+            if num_shards == len(self._shards):
+                return
+            if all(shard.healthy for shard in self._shards):
+                parts = [shard.call("dump") for shard in self._shards]
+                vectors = np.concatenate([p[0] for p in parts if len(p[1])]) if len(self) else None
+                texts = [t for p in parts for t in p[1]]
+                metadatas = [m for p in parts for m in p[2]]
+            else:
+                # A failed shard can't be dumped; rebuild every shard from the source index instead
+                vectors, texts, metadatas = self._source()
+            old_count = len(self._shards)
+            self._stop_all()
+            self._start(num_shards)
+            if texts:
+                self._distribute(vectors, texts, metadatas)
+            moved = sum(shard_for(t, old_count) != shard_for(t, num_shards) for t in texts)
+            logger.info(f"🔀 Rebalanced {old_count} → {num_shards} shards ({moved}/{len(texts)} chunks moved)")
+
+    def _stop_all(self):
+        for shard in self._shards:
+            shard.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._shards = []
+
+    def close(self):
+        with self._admin_lock:
+            self._stop_all()
+
+_store = None
+_store_lock = threading.Lock()
+
+def _source_count(vector_store):
+    try:
+        return vector_store._collection.count()
+    except Exception:
+        return len(vector_store)
+
+def get_sharded_store(vector_store, embeddings, num_shards=NUM_SHARDS):
+    """Process-wide sharded store so Streamlit sessions don't each spawn their own workers"""
+    global _store
+    with _store_lock:
+        if _store is not None and len(_store) != _source_count(vector_store):
+            # The underlying index was rebuilt; reload every shard from it
+            _store.close()
+            _store = None
+        if _store is None:
+            _store = ShardedVectorStore.from_vector_store(vector_store, embeddings, num_shards)
+        elif _store.num_shards != num_shards:
+            _store.resize(num_shards)
+        return _store
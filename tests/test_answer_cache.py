@@ -0,0 +1,41 @@
+import pytest
+import chat_manager
+import search_manager
+from answer_cache import AnswerCache
+from chat_manager import automatic_search
+from fake_backends import FakeLLM, fake_google_search
+from utils import QUICK_QUESTIONS
+
+QUICK_QUESTION = next(iter(QUICK_QUESTIONS.values()))[0]
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(chat_manager, "_answer_cache", AnswerCache(ttl=60))
+    search_manager.set_search_backend(lambda query: fake_google_search(query, latency=0))
+    yield
+    search_manager.set_search_backend(None)
+
+def test_quick_question_is_served_from_cache_with_its_own_timing():
+    llm = FakeLLM(latency=0)
+    first, _, meta = automatic_search(llm, None, QUICK_QUESTION)
+    second, _, cached = automatic_search(llm, None, QUICK_QUESTION)
+    assert llm.calls == 1
+    assert second == first
+    assert cached["from_cache"] is True
+    assert set(cached["timings"]) == {"cache_ms"}
+    assert cached["cached_timings"] == meta["timings"]
+
+def test_free_form_questions_are_not_cached():
+    llm = FakeLLM(latency=0)
+    for _ in range(2):
+        _, _, meta = automatic_search(llm, None, "What did the latest earnings call say?")
+        assert "from_cache" not in meta
+    assert llm.calls == 2
+
+def test_batch_priority_bypasses_cache():
+    llm = FakeLLM(latency=0)
+    automatic_search(llm, None, QUICK_QUESTION)
+    for _ in range(3):
+        _, _, meta = automatic_search(llm, None, QUICK_QUESTION, priority="batch")
+        assert "from_cache" not in meta and "llm_ms" in meta["timings"]
+    assert llm.calls == 4
@@ -0,0 +1,79 @@
+import json
+import time
+import pytest
+import search_manager
+from batch_qa import build_backends, load_checkpoint, load_questions, run_batch
+from fake_backends import FakeLLM, RateLimitedFakeLLM, fake_google_search
+from llm_scheduler import UnlimitedScheduler
+
+class FailingLLM(FakeLLM):
+    def invoke(self, prompt):
+        self.calls += 1
+        raise RuntimeError("upstream 500")
+
+@pytest.fixture(autouse=True)
+def fake_web():
+    search_manager.set_search_backend(lambda query: fake_google_search(query, latency=0))
+    yield
+    search_manager.set_search_backend(None)
+
+def write_questions(n, prefix):
+    return [{"id": str(i), "question": f"{prefix} question number {i}"} for i in range(n)]
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_resume_skips_answered_questions(tmp_path):
+    output = tmp_path / "results.jsonl"
+    questions = write_questions(6, "resume")
+    llm = FakeLLM(latency=0)
+
+    assert run_batch(questions[:4], output, llm, None, 3, UnlimitedScheduler()) == {"answered": 4, "errors": 0}
+    assert load_checkpoint(output) == {"0", "1", "2", "3"}
+
+    assert run_batch(questions, output, llm, None, 3, UnlimitedScheduler()) == {"answered": 2, "errors": 0}
+    assert llm.calls == 6
+    results = read_results(output)
+    assert sorted(r["id"] for r in results) == [str(i) for i in range(6)]
+    assert all(r["answer"].startswith("[fake answer") for r in results)
+
+def test_llm_failures_are_errors_and_retried(tmp_path):
+    output = tmp_path / "results.jsonl"
+    questions = write_questions(2, "failing")
+
+    stats = run_batch(questions, output, FailingLLM(latency=0), None, scheduler=UnlimitedScheduler())
+    assert stats == {"answered": 0, "errors": 2}
+    assert all(r["error"] == "upstream 500" and "answer" not in r for r in read_results(output))
+    assert load_checkpoint(output) == set()
+
+    assert run_batch(questions, output, FakeLLM(latency=0), None, scheduler=UnlimitedScheduler()) == {"answered": 2, "errors": 0}
+    assert load_checkpoint(output) == {"0", "1"}
+
+def test_offline_runs_are_not_paced_to_the_groq_quota(tmp_path):
+    llm, _, scheduler = build_backends(fake_llm=True, fake_web=True, use_index=False)
+    llm.latency = 0
+    start = time.perf_counter()
+    stats = run_batch(write_questions(60, "offline"), tmp_path / "results.jsonl", llm, None, 8, scheduler)
+    assert stats == {"answered": 60, "errors": 0}
+    assert time.perf_counter() - start < 5
+
+def test_fake_limits_pace_the_scheduler_to_the_fake(tmp_path):
+    llm, _, scheduler = build_backends(fake_llm=True, fake_web=True, use_index=False, fake_limits=(600, 10**6))
+    llm.latency = 0
+    assert isinstance(llm, RateLimitedFakeLLM)
+    assert scheduler.requests.capacity == pytest.approx(540)
+    stats = run_batch(write_questions(20, "limited"), tmp_path / "results.jsonl", llm, None, 8, scheduler)
+    assert stats == {"answered": 20, "errors": 0}
+    assert llm.rejected == 0
+
+def test_invalid_question_records_are_skipped(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text('{"id": 1, "question": "ok"}\n{"id": 3}\nnot json\n"bare string"\n[1, 2]\n{"question": "  "}\n',
+                    encoding="utf-8")
+    assert load_questions(path) == [{"id": "1", "question": "ok"}, {"id": "4", "question": "bare string"}]
+
+def test_truncated_checkpoint_line_is_ignored(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text('{"id": "a", "answer": "ok"}\n{"id": "b", "ans', encoding="utf-8")
+    assert load_checkpoint(output) == {"a"}
@@ -0,0 +1,63 @@
+import random
+import numpy as np
+from langchain_core.documents import Document
+from chunk_dedup import NUM_PERM, minhash_signature, find_duplicate_groups, deduplicate_chunks
+from offset_chunker import ChunkTable
+
+def random_text(rng, words=400):
+    return " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)) for _ in range(words))
+
+def test_permutations_pick_different_minimum_shingles():
+    rng = random.Random(0)
+    a, b = random_text(rng, 200), random_text(rng, 200)
+    # Unrelated texts must agree on roughly none of the signature, not all-or-nothing
+    agreement = np.mean(minhash_signature(a) == minhash_signature(b))
+    assert agreement < 0.05
+    words = a.split()
+    words[100] = "changed"
+    near = np.mean(minhash_signature(a) == minhash_signature(" ".join(words)))
+    assert 0.9 < near < 1.0
+    assert len(set(minhash_signature(a))) > NUM_PERM // 2
+
+def test_overlapping_and_unrelated_chunks_are_kept():
+    rng = random.Random(1)
+    docs = [Document(page_content=random_text(rng), metadata={"source": f"doc{i}.pdf", "page": 0}) for i in range(20)]
+    table = ChunkTable.from_documents(docs)
+    kept, stats = deduplicate_chunks(table, 0.9)
+    assert stats["dropped_chunks"] == 0
+    assert len(kept) == len(table)
+
+def test_exact_and_near_copies_are_collapsed():
+    rng = random.Random(2)
+    original = random_text(rng, 400)
+    words = original.split()
+    words[200] = "changed"
+    chunks = [
+        Document(page_content=original, metadata={"source": "a.pdf", "page": 1}),
+        Document(page_content=random_text(rng, 400), metadata={"source": "b.pdf", "page": 1}),
+        Document(page_content=original, metadata={"source": "c.pdf", "page": 3}),
+        Document(page_content=" ".join(words), metadata={"source": "d.pdf", "page": 2}),
+    ]
+    kept, stats = deduplicate_chunks(chunks, 0.9)
+    assert stats["dropped_chunks"] == 2
+    assert [c.metadata["source"] for c in kept] == ["a.pdf", "b.pdf"]
+    assert kept[0].metadata["duplicate_sources"] == "c.pdf#p3; d.pdf#p2"
+
+def test_grouping_is_not_transitive():
+    # A~B and B~C (Jaccard ~0.5) while A~C is only ~0.33: C must not join A's group through B
+    rng = random.Random(3)
+    part = [random_text(rng, 100).split() for _ in range(3)]
+    a = " ".join(part[0] + part[1])
+    b = " ".join(part[1])
+    c = " ".join(part[1] + part[2])
+    groups = find_duplicate_groups([a, b, c], 0.4)
+    assert 1 in groups.get(0, [])
+    assert 2 not in groups.get(0, [])
+
+def test_stats_describe_only_the_call_that_returned_them():
+    rng = random.Random(4)
+    text = random_text(rng, 200)
+    _, first = deduplicate_chunks([Document(page_content=text), Document(page_content=text)], 0.9)
+    _, second = deduplicate_chunks([Document(page_content=random_text(rng, 200))], 0.9)
+    assert first["dropped_chunks"] == 1 and first["input_chunks"] == 2
+    assert second["dropped_chunks"] == 0 and second["input_chunks"] == 1
@@ -0,0 +1,94 @@
+import pytest
+from langchain_core.documents import Document
+from context_compressor import compress_documents, split_sentences
+from utils import estimate_tokens
+
+class KeywordEmbeddings:
+    """Sentence vector = (apple count, banana count, bias) so scores are predictable"""
+
+    def __init__(self):
+        self.batches = 0
+
+    def embed_documents(self, texts):
+        self.batches += 1
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count("apple")), float(text.count("banana")), 0.1]
+
+QUERY = [1.0, 0.0, 0.0]
+
+def documents():
+    return [
+        Document(page_content="Bananas are yellow banana. Apples are red apple. Cherries are dark. "
+                              "Grapes grow in bunches. Pears are green.", metadata={"source": "a.pdf"}),
+        Document(page_content="Nothing here about fruit one. Another filler two. "
+                              "Apple pie, apple tart and apple cake.", metadata={"source": "b.pdf"}),
+    ]
+
+def test_split_sentences_keeps_abbreviations_and_short_fragments():
+    assert split_sentences("Dr. Smith went to Washington. He left.") == ["Dr. Smith went to Washington.", "He left."]
+    assert split_sentences("Intro\nFirst point. Ok. Next one.") == ["Intro", "First point.", "Ok. Next one."]
+
+def test_best_sentence_and_its_neighbours_are_kept():
+    kept, stats = compress_documents(documents(), QUERY, KeywordEmbeddings(), max_sentences=1)
+    assert [d.metadata["source"] for d in kept] == ["b.pdf"]
+    assert kept[0].page_content == "Another filler two. Apple pie, apple tart and apple cake."
+    assert kept[0].metadata["compressed"] is True
+
+    kept, _ = compress_documents(documents(), QUERY, KeywordEmbeddings(), max_sentences=1, neighbours=0)
+    assert kept[0].page_content == "Apple pie, apple tart and apple cake."
+
+def test_output_keeps_original_document_and_sentence_order():
+    kept, stats = compress_documents(documents(), QUERY, KeywordEmbeddings(), max_sentences=2)
+    assert [d.metadata["source"] for d in kept] == ["a.pdf", "b.pdf"]
+    assert kept[0].page_content == "Bananas are yellow banana. Apples are red apple. Cherries are dark."
+    assert stats["sentences_kept"] == 5 and stats["sentences_total"] == 8
+
+def test_token_accounting():
+    docs = documents()
+    kept, stats = compress_documents(docs, QUERY, KeywordEmbeddings(), max_sentences=1)
+    assert stats["tokens_before"] == sum(estimate_tokens(d.page_content) for d in docs)
+    assert stats["tokens_after"] == sum(estimate_tokens(d.page_content) for d in kept)
+    assert stats["input_tokens_saved"] == stats["tokens_before"] - stats["tokens_after"] > 0
+
+def test_short_context_is_returned_untouched_without_embedding():
+    docs, embeddings = documents(), KeywordEmbeddings()
+    kept, stats = compress_documents(docs, QUERY, embeddings, max_sentences=8)
+    assert kept is docs
+    assert embeddings.batches == 0
+    assert stats["input_tokens_saved"] == 0 and stats["tokens_after"] == stats["tokens_before"]
+
+class FakeStore:
+    def __init__(self, docs):
+        self.docs, self.embeddings = docs, KeywordEmbeddings()
+
+    def search_by_vector(self, query_vector, k):
+        return [(doc, 0.9) for doc in self.docs[:k]]
+
+@pytest.mark.parametrize("query, compressed", [("latest apple news", False), ("apple cake recipes", True)])
+def test_compression_only_runs_when_documents_reach_the_prompt(monkeypatch, query, compressed):
+    pytest.importorskip("langchain_community")
+    import chat_manager
+    import context_compressor
+    import search_manager
+    from fake_backends import FakeLLM, fake_google_search
+    from llm_scheduler import UnlimitedScheduler
+
+    calls = []
+    def spy(*args, **kwargs):
+        calls.append(1)
+        return compress_documents(*args, **kwargs)
+
+    monkeypatch.setattr(chat_manager, "CONTEXT_COMPRESSION", True)
+    monkeypatch.setattr(context_compressor, "compress_documents", spy)
+    search_manager.set_search_backend(lambda q: fake_google_search(q, latency=0))
+    try:
+        store = FakeStore(documents() * 2)
+        _, metadata = chat_manager._run_search(FakeLLM(latency=0), store, query, chat_manager.detect_query_type(query),
+                                               scheduler=UnlimitedScheduler())
+    finally:
+        search_manager.set_search_backend(None)
+    assert bool(calls) == compressed
+    assert ("input_tokens_saved" in metadata) == compressed
@@ -0,0 +1,41 @@
+from conversation_store import ConversationStore
+
+def fill(store, session_id, n, offset=0):
+    return [store.append(session_id, f"q{i}", f"a{i}", {"mode": "hybrid", "i": i}) for i in range(offset, offset + n)]
+
+def test_window_is_bounded_to_the_newest_turns(tmp_path):
+    store = ConversationStore(str(tmp_path / "c.db"), window=3)
+    fill(store, "s1", 7)
+    window = store.load_window("s1")
+    assert window.maxlen == 3
+    assert [t["question"] for t in window] == ["q4", "q5", "q6"]
+    window.append({"question": "q7"})
+    assert [t["question"] for t in window] == ["q5", "q6", "q7"]
+    assert store.recent("s1")[0]["metadata"] == {"mode": "hybrid", "i": 4}
+
+def test_older_and_between_page_one_session(tmp_path):
+    store = ConversationStore(str(tmp_path / "c.db"), window=2)
+    ids = []
+    # Interleave sessions so ids are not contiguous per session
+    for i in range(5):
+        ids += fill(store, "s1", 1, i)
+        fill(store, "other", 1, i)
+    assert [t["question"] for t in store.older("s1", ids[3])] == ["q1", "q2"]
+    assert [t["question"] for t in store.older("s1", ids[1])] == ["q0"]
+    assert store.older("s1", ids[0]) == []
+    assert [t["question"] for t in store.between("s1", ids[1], ids[4])] == ["q1", "q2", "q3"]
+    assert store.count("s1") == 5
+
+def test_clear_only_removes_one_session(tmp_path):
+    store = ConversationStore(str(tmp_path / "c.db"))
+    fill(store, "s1", 3)
+    fill(store, "s2", 2)
+    store.clear("s1")
+    assert store.count("s1") == 0 and store.recent("s1") == []
+    assert store.count("s2") == 2
+
+def test_turns_survive_reopening_the_database(tmp_path):
+    path = str(tmp_path / "c.db")
+    fill(ConversationStore(path), "s1", 2)
+    reopened = ConversationStore(path)
+    assert [t["answer"] for t in reopened.load_window("s1")] == ["a0", "a1"]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from index_snapshot import SnapshotVectorStore, top_k_relevance, verify_snapshot, write_snapshot
+
+CONFIG = {"embedding_model": "test-model", "chunk_size": 100}
+
+@pytest.fixture
+def snapshot(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    texts = [f"chunk {i} é" for i in range(40)]
+    metadatas = [{"source": f"doc{i % 3}.pdf", "page": i} for i in range(40)]
+    path = tmp_path / "index.snapshot"
+    write_snapshot(path, vectors, texts, metadatas, config=CONFIG)
+    return path, vectors, texts, metadatas
+
+def test_round_trip_and_search(snapshot):
+    path, vectors, texts, metadatas = snapshot
+    store = SnapshotVectorStore(path, None, config=CONFIG)
+    try:
+        assert len(store) == 40
+        assert store.text(5) == texts[5] and store.metadata(5) == metadatas[5]
+        idx, _ = top_k_relevance(vectors, np.einsum("ij,ij->i", vectors, vectors), vectors[3], 4)
+        assert [doc.page_content for doc, _ in store.search_by_vector(vectors[3], 4)] == [texts[i] for i in idx]
+    finally:
+        store.close()
+
+def test_close_releases_the_mapping(snapshot):
+    store = SnapshotVectorStore(snapshot[0], None, config=CONFIG)
+    store.search_by_vector(snapshot[1][0], 3)
+    store.close()
+    assert store._mm.closed and store._file.closed
+
+def test_config_mismatch_is_rejected(snapshot):
+    with pytest.raises(ValueError, match="config mismatch"):
+        SnapshotVectorStore(snapshot[0], None, config=dict(CONFIG, chunk_size=200))
+
+def test_corruption_is_detected(snapshot):
+    path = snapshot[0]
+    assert verify_snapshot(path)["count"] == 40
+    data = bytearray(path.read_bytes())
+    data[-100] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="checksum"):
+        verify_snapshot(path)
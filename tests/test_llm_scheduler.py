@@ -0,0 +1,95 @@
+import time
+import threading
+from fake_backends import FakeLLM, RateLimitedFakeLLM
+from llm_scheduler import (
+    PRIORITY_BACKGROUND, PRIORITY_BATCH, PRIORITY_INTERACTIVE,
+    LLMScheduler, PriorityTicket, TokenBucket, invoke_llm,
+)
+
+def run_queued(scheduler, tickets, stagger=0.03):
+    """Queue one admit per ticket (in order) behind an empty bucket; return admission order"""
+    order, lock = [], threading.Lock()
+
+    def worker(name, ticket):
+        scheduler.admit(10, ticket)
+        with lock:
+            order.append(name)
+
+    threads = []
+    for name, ticket in tickets:
+        thread = threading.Thread(target=worker, args=(name, ticket))
+        thread.start()
+        threads.append(thread)
+        time.sleep(stagger)
+    return order, threads
+
+def test_token_bucket_refills_and_waits():
+    bucket = TokenBucket(10, period=1.0)
+    now = bucket.updated
+    bucket.take(10, now)
+    assert bucket.wait_time(5, now) == 0.5
+    assert bucket.wait_time(5, now + 0.5) == 0.0
+    bucket.adjust(-20)
+    assert bucket.level < 0
+
+def test_interactive_is_admitted_before_queued_background_work():
+    scheduler = LLMScheduler(rpm=1, tpm=10**6, period=0.2, headroom=1.0)
+    scheduler.admit(10)  # drain the only request slot
+    order, threads = run_queued(scheduler, [
+        ("background", PRIORITY_BACKGROUND),
+        ("batch", PRIORITY_BATCH),
+        ("interactive", PRIORITY_INTERACTIVE),
+    ])
+    for thread in threads:
+        thread.join(5)
+    assert order == ["interactive", "batch", "background"]
+
+def test_background_burst_leaves_room_for_interactive_calls():
+    # Default Groq quota: a prefetch burst of 1,500-token calls must not drain the TPM bucket
+    scheduler = LLMScheduler(rpm=30, tpm=12000)
+    for _ in range(7):
+        threading.Thread(target=scheduler.admit, args=(1500, PRIORITY_BACKGROUND), daemon=True).start()
+    time.sleep(0.2)
+    assert scheduler.queue_depth() > 0  # the burst is held back by the reserve
+    assert scheduler.admit(1500, PRIORITY_INTERACTIVE) < 0.05
+    assert scheduler.admit(1500, PRIORITY_INTERACTIVE) < 0.05
+
+def test_promoted_ticket_jumps_the_queue():
+    scheduler = LLMScheduler(rpm=1, tpm=10**6, period=0.2, headroom=1.0)
+    scheduler.admit(10)
+    prefetch = PriorityTicket("background")
+    order, threads = run_queued(scheduler, [("batch", PriorityTicket("batch")), ("prefetch", prefetch)])
+    scheduler.promote(prefetch, "interactive")
+    scheduler.promote(prefetch, "background")  # never lowers
+    for thread in threads:
+        thread.join(5)
+    assert order == ["prefetch", "batch"]
+    assert prefetch.level == PRIORITY_INTERACTIVE
+
+def test_scheduler_keeps_calls_inside_provider_limits():
+    llm = RateLimitedFakeLLM(rpm=5, tpm=100000, period=1.0, latency=0)
+    scheduler = LLMScheduler(rpm=5, tpm=100000, period=1.0)
+    threads = [threading.Thread(target=invoke_llm, args=(llm, f"QUESTION: q{i}\n", "batch", scheduler)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert llm.calls == 10
+    assert llm.rejected == 0
+    assert scheduler.stats()["admitted"] == 10
+
+def test_rate_limit_error_is_retried_once():
+    class FlakyLLM(FakeLLM):
+        failures = 1
+
+        def invoke(self, prompt):
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("Error code: 429 - rate limit exceeded")
+            return super().invoke(prompt)
+
+    llm = FlakyLLM(latency=0)
+    scheduler = LLMScheduler(rpm=600, tpm=10**6, period=1.0)
+    response, _ = invoke_llm(llm, "QUESTION: hi\n", scheduler=scheduler)
+    assert llm.calls == 1 and llm.failures == 0
+    assert response.content.endswith("hi")
@@ -0,0 +1,44 @@
+import random
+from langchain_core.documents import Document
+from offset_chunker import ChunkTable, split_offsets
+
+def sample_pages():
+    rng = random.Random(0)
+    words = lambda n: " ".join(rng.choice(["alpha", "beta", "gamma", "delta", "epsilon"]) for _ in range(n))
+    return [
+        Document(page_content=words(400) + "\n\n" + words(300), metadata={"source": "a.pdf", "page": 0, "category": "AI"}),
+        Document(page_content=words(250), metadata={"source": "a.pdf", "page": 1, "category": "AI"}),
+        Document(page_content=words(30), metadata={"source": "b.pdf", "page": 0, "category": "Business"}),
+    ]
+
+def test_split_offsets_respects_size_and_word_boundaries():
+    text = sample_pages()[0].page_content
+    spans = list(split_offsets(text, 0, len(text), chunk_size=300, chunk_overlap=60))
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert end - start <= 300
+        # Chunks overlap or are separated only by whitespace, so no text is lost
+        assert next_start < end or not text[end:next_start].strip()
+        assert text[next_start - 1] in " \n"
+    assert all(not text[s:e].startswith(" ") and not text[s:e].endswith(" ") for s, e in spans)
+
+def test_chunks_stay_within_their_page_and_share_page_metadata():
+    pages = sample_pages()
+    table = ChunkTable.from_documents(pages, chunk_size=300, chunk_overlap=60)
+    assert len(table.buffers) == 2
+    for i in range(len(table)):
+        doc = table[i]
+        page = next(p for p in pages if p.metadata is table.pages[table.page_ref[i]][1])
+        assert doc.page_content in page.page_content
+        assert doc.metadata == page.metadata
+    assert table.count_by("category")["Business"] == 1
+
+def test_select_and_annotate_keep_extras_aligned():
+    table = ChunkTable.from_documents(sample_pages(), chunk_size=300, chunk_overlap=60)
+    table.annotate(2, {"duplicate_count": 1})
+    subset = table.select([0, 2, 3])
+    assert len(subset) == 3
+    assert subset.text(1) == table.text(2)
+    assert subset.metadata(1)["duplicate_count"] == 1
+    assert "duplicate_count" not in subset.metadata(0)
+    assert [d.page_content for d in subset[1:]] == [table.text(2), table.text(3)]
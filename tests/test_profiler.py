@@ -0,0 +1,54 @@
+import time
+import threading
+import pytest
+import profiler
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+    profiler.set_profiling(True)
+    yield tmp_path
+    profiler.set_profiling(False)
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_disabled_wrapper_is_transparent(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+    assert profiled_square(3) == 9
+    assert list(tmp_path.iterdir()) == []
+
+@profiler.profiled("square")
+def profiled_square(x):
+    return x * x
+
+def test_profiles_written_in_the_same_second_are_all_kept(profile_dir):
+    @profiler.profiled("quick")
+    def quick():
+        busy(0.03)
+
+    for _ in range(5):
+        quick()
+    assert len(list(profile_dir.glob("quick-*.folded"))) == 5
+
+def test_concurrent_calls_do_not_share_samples(profile_dir):
+    @profiler.profiled("slow")
+    def slow_other_call():
+        busy(0.3)
+
+    @profiler.profiled("fast")
+    def fast_call():
+        busy(0.1)
+
+    other = threading.Thread(target=slow_other_call)
+    other.start()
+    time.sleep(0.02)
+    fast_call()
+    other.join()
+
+    fast = "".join(p.read_text() for p in profile_dir.glob("fast-*.folded"))
+    slow = "".join(p.read_text() for p in profile_dir.glob("slow-*.folded"))
+    assert "fast_call" in fast and "slow_other_call" not in fast
+    assert "slow_other_call" in slow and "fast_call" not in slow
@@ -0,0 +1,94 @@
+import time
+import threading
+from request_coalescer import SingleFlight, normalize_query
+
+def test_normalize_query():
+    assert normalize_query("  What is   BERT? ") == "what is bert?"
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    calls, joined, results = [], [], []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "answer"
+
+    def caller():
+        results.append(flight.do("q", compute, context="leader", on_join=joined.append))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert joined == ["leader"] * 4
+    assert flight.in_flight() == 0
+    assert flight.stats() == {"leader_calls": 1, "coalesced_calls": 4}
+
+def test_errors_propagate_to_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def caller():
+        try:
+            flight.do("q", compute)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=caller)]
+    threads[0].start()
+    started.wait(1)
+    threads.append(threading.Thread(target=caller))
+    threads[1].start()
+    for thread in threads:
+        thread.join(2)
+    assert errors == ["boom", "boom"]
+
+def test_identical_automatic_searches_make_one_upstream_call():
+    import search_manager
+    from chat_manager import automatic_search, get_coalescing_stats
+    from fake_backends import FakeLLM, fake_google_search
+    from llm_scheduler import UnlimitedScheduler
+
+    web_calls = []
+    def fake_web(query):
+        web_calls.append(query)
+        return fake_google_search(query, latency=0)
+
+    llm, scheduler = FakeLLM(latency=0.3), UnlimitedScheduler()
+    before = get_coalescing_stats()
+    search_manager.set_search_backend(fake_web)
+    try:
+        # Different spellings of one hybrid question normalise to the same key
+        queries = ["What is coalescing?", "what is  coalescing?", "WHAT IS COALESCING?", "What is coalescing?"]
+        results = []
+        threads = [threading.Thread(target=lambda q=q: results.append(automatic_search(llm, None, q, scheduler=scheduler)))
+                   for q in queries]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        search_manager.set_search_backend(None)
+
+    after = get_coalescing_stats()
+    assert llm.calls == 1 and len(web_calls) == 1
+    assert len({response for response, _, _ in results}) == 1
+    assert sum(meta["coalesced"] for _, _, meta in results) == 3
+    assert after["groq_calls_saved"] - before["groq_calls_saved"] == 3
+    assert after["serper_calls_saved"] - before["serper_calls_saved"] == 3
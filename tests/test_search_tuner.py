@@ -0,0 +1,48 @@
+import numpy as np
+from search_tuner import CHROMA_DEFAULT_SEARCH_EF, choose, exact_ground_truth, sweep
+
+class FakeCollection:
+    """Chroma collection stand-in whose recall depends on hnsw:search_ef like a real HNSW index
+
+    Only the first `search_ef * 4` vectors are reachable, so a small ef misses neighbours.
+    """
+
+    def __init__(self, vectors, texts, metadata):
+        self.vectors, self.texts, self.metadata = vectors, texts, metadata
+        self.modified = []
+
+    def modify(self, metadata):
+        self.modified.append(dict(metadata))
+        self.metadata = dict(metadata)
+
+    def query(self, query_embeddings, n_results, include):
+        reachable = self.metadata.get("hnsw:search_ef", CHROMA_DEFAULT_SEARCH_EF) * 4
+        distances = np.linalg.norm(self.vectors[:reachable] - np.asarray(query_embeddings[0]), axis=1)
+        order = np.argsort(distances)[:n_results]
+        return {"documents": [[self.texts[i] for i in order]], "distances": [[float(distances[i]) for i in order]]}
+
+class FakeStore:
+    def __init__(self, collection):
+        self._collection = collection
+
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, [f"chunk {i}" for i in range(500)]
+
+def test_sweep_measures_search_ef_and_restores_it():
+    vectors, texts = corpus()
+    collection = FakeCollection(vectors, texts, {"hnsw:space": "l2", "hnsw:search_ef": 40})
+    queries = vectors[::50] + 0.01  # spread over the whole index, not just the start
+
+    truth = exact_ground_truth(vectors, texts, queries, 4, 0.0)
+    rows = sweep(FakeStore(collection), queries, truth, k=4, thresholds=[0.0], repeats=1)
+
+    recall = {row["search_ef"]: row["recall"] for row in rows if row["fetch_k"] == 4}
+    assert set(recall) == {None, 16, 32, 64, 128}
+    assert recall[None] < recall[64] < recall[128] == 1.0
+    assert choose(rows, 0.95)["search_ef"] == 128
+    # The live collection is left as it was found
+    assert collection.metadata["hnsw:search_ef"] == 40
+    assert all("hnsw:space" not in m for m in collection.modified)
@@ -0,0 +1,65 @@
+import time
+import numpy as np
+import pytest
+from index_snapshot import top_k_relevance
+from shard_manager import ShardedVectorStore
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(300)]
+    metadatas = [{"i": i} for i in range(300)]
+    return vectors, texts, metadatas
+
+@pytest.fixture
+def store(corpus):
+    store = ShardedVectorStore(None, 3, *corpus)
+    yield store
+    store.close()
+
+def exact(corpus, query, k):
+    vectors, texts, _ = corpus
+    idx, _ = top_k_relevance(vectors, np.einsum("ij,ij->i", vectors, vectors), query, k)
+    return [texts[i] for i in idx]
+
+def search_texts(store, query, k):
+    return [doc.page_content for doc, _ in store.search_by_vector(query, k)]
+
+def wait_until(predicate, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+def test_scatter_gather_matches_exact_search(store, corpus):
+    query = corpus[0][7]
+    assert search_texts(store, query, 5) == exact(corpus, query, 5)
+    assert store.last_search_status() == {"shards": 3, "failed_shards": [], "partial": False}
+    assert len(store) == 300
+
+def test_failed_shard_is_reported_and_respawned(store, corpus):
+    query = corpus[0][7]
+    victim = store._shards[1]
+    victim.process.kill()
+    victim.process.join()
+
+    partial = search_texts(store, query, 5)
+    status = store.last_search_status()
+    assert status["partial"] and status["failed_shards"] == [1]
+    assert len(partial) == 5
+
+    assert wait_until(lambda: store._shards[1] is not victim and not store._recovering)
+    assert search_texts(store, query, 5) == exact(corpus, query, 5)
+    assert not store.last_search_status()["partial"]
+    assert all(shard["alive"] for shard in store.health())
+
+def test_resize_rebuilds_from_source_when_a_shard_is_down(store, corpus):
+    store._shards[0].healthy = False
+    store.resize(4)
+    assert store.num_shards == 4
+    assert len(store) == 300
+    query = corpus[0][42]
+    assert search_texts(store, query, 5) == exact(corpus, query, 5)
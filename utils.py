@@ -1,5 +1,7 @@
 import os
+import time
 import logging
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,14 +14,76 @@ EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
 GROQ_MODEL = "llama-3.3-70b-versatile"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+CHUNKER = os.getenv("CHUNKER", "offset")  # "offset" (shared text arena) or "recursive" (LangChain splitter)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # MinHash Jaccard cutoff; 0 disables dedup
 TOP_K_RESULTS = 4
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))        # Provider requests-per-minute quota
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))     # Provider tokens-per-minute quota
+COMPLETION_TOKENS_ESTIMATE = 512  # Expected answer length reserved against the TPM quota
+INTERACTIVE_RESERVE = 0.3  # Share of the RPM/TPM budget batch and background calls may not use
+NUM_SHARDS = int(os.getenv("NUM_SHARDS", "0"))  # >0 spreads the index over that many worker processes
 VECTOR_STORE_PATH = "./vector_store"
+SEARCH_SETTINGS_PATH = "./search_settings.json"  # Written by `python search_tuner.py`
+SNAPSHOT_PATH = "./index.snapshot"  # Single-file index written by `python index_snapshot.py export`
 DOCUMENTS_FOLDER = "documents"
+CONVERSATION_DB_PATH = "./conversations.db"
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "900"))  # Seconds a cached answer stays valid
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "0") == "1"  # Trim retrieved chunks to query-relevant sentences
+COMPRESSION_MAX_SENTENCES = 8  # Top-scoring sentences kept (each with its neighbours)
+PROFILING = os.getenv("PROFILING", "0") == "1"  # Sampling profiler around ingestion and queries
+PROFILE_DIR = "./profiles"
+PROFILE_INTERVAL_MS = 5  # Sampling period
+PROFILE_EVERY_N = int(os.getenv("PROFILE_EVERY_N", "1"))  # Queries aggregated into each profile file
+PREFETCH_INTERVAL = 60  # Seconds between Quick Question prefetch scans
+HISTORY_WINDOW = 5  # Turns kept in memory per session; older turns stay on disk
+
+# Most-clicked questions, shown as buttons in the UI
+QUICK_QUESTIONS = {
+    "🤖 Artificial Intelligence": [
+        "Explain the difference between AI and machine learning",
+        "What are the latest trends in natural language processing?",
+        "How do neural networks learn from data?",
+        "What are the ethical considerations in AI development?"
+    ],
+    "💼 Business Strategy": [
+        "What are the key elements of a successful business model?",
+        "How to conduct competitive market analysis?",
+        "Explain different digital transformation strategies",
+        "What are current challenges in global business?"
+    ],
+    "🔬 Research Methodology": [
+        "What are the best practices for academic research?",
+        "How to design effective research experiments?",
+        "Explain qualitative vs quantitative research methods",
+        "What makes research findings statistically significant?"
+    ],
+    "🚀 Technology Trends": [
+        "What are the emerging technologies in 2024?",
+        "How is cloud computing evolving?",
+        "Explain the impact of IoT on daily life",
+        "What are the security challenges in modern tech?"
+    ]
+}
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_token_encoding = None
+
+def estimate_tokens(text):
+    """Token count via tiktoken's cl100k_base when available, else ~4 characters per token"""
+    global _token_encoding
+    if _token_encoding is None:
+        try:
+            import tiktoken
+            _token_encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _token_encoding = False
+    if _token_encoding:
+        return len(_token_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
 def validate_environment():
     """Validate required environment variables"""
     errors = []
@@ -29,6 +93,17 @@ def validate_environment():
         errors.append("SERPER_API_KEY is not set")
     return errors
 
+@contextmanager
+def cpu_timer(label):
+    """Log CPU and wall time spent in a block (thread CPU, so other sessions don't skew it)"""
+    cpu_start, wall_start = time.thread_time(), time.perf_counter()
+    try:
+        yield
+    finally:
+        cpu_ms = (time.thread_time() - cpu_start) * 1000
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+        logger.info(f"⏱️ {label}: {cpu_ms:.1f} ms CPU, {wall_ms:.1f} ms wall")
+
 def detect_query_type(query):
     """Automatically detect the best search type for a query"""
     query_lower = query.lower()